@@ -14,7 +14,7 @@ import asyncio
 
 # Import our services
 from services.ai_image_generator import AIImageGenerator
-from services.threed_client_factory import create_3d_client
+from services.threed_client_factory import create_3d_client, shutdown_3d_client
 from services.sticker_maker_service import StickerMakerService  # Replaced BlenderProcessor
 from config.settings import settings
 from fastapi.staticfiles import StaticFiles
@@ -1058,6 +1058,18 @@ async def general_exception_handler(request, exc):
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("🛑 API shutting down...")
+
+    # Close pooled 3D API connections
+    try:
+        await shutdown_3d_client()
+    except Exception as e:
+        logger.error(f"❌ Error closing 3D client: {e}")
+
+    # Write orders still waiting in the insert batch queue
+    try:
+        await get_supabase_client().close()
+    except Exception as e:
+        logger.error(f"❌ Error closing Supabase client: {e}")
     
     # Log final statistics
     total_jobs = len(job_storage)
@@ -53,6 +53,7 @@ class Settings(BaseSettings):
     SUPABASE_URL: str = "https://dhsblngaosaxxmwbiusa.supabase.co"
     SUPABASE_ANON_KEY: str = ""  # Public key for client-side
     SUPABASE_SERVICE_KEY: str = ""  # Secret key for server-side
+    SUPABASE_DB_URL: str = ""  # Optional Postgres DSN (transaction pooler) for direct asyncpg queries
 
     # Sculptok API Configuration (https://api.sculptok.com)
     SCULPTOK_API_KEY: str = ""
@@ -76,6 +77,10 @@ class Settings(BaseSettings):
     TRIPO3D_TIMEOUT: int = 300  # 5 minutes timeout
     TRIPO3D_POLL_INTERVAL: int = 5  # Seconds between status checks
     TRIPO3D_MAX_POLL_ATTEMPTS: int = 120  # Max polling attempts (10 minutes total)
+    TRIPO3D_MIN_POLL_INTERVAL: int = 1  # First/near-complete poll delay (seconds)
+    TRIPO3D_MAX_POLL_INTERVAL: int = 15  # Backoff cap between status checks
+    TRIPO3D_MAX_CONCURRENT_UPLOADS: int = 4  # In-flight uploads/downloads per process
+    TRIPO3D_MAX_CONCURRENT_TASKS: int = 8  # In-flight task-create requests per process
 
     # Background Removal Configuration
     REMBG_MODEL: str = "u2net"  # u2net, u2net_human_seg, silueta, etc.
@@ -1,6 +1,6 @@
 import asyncio
 import os
-from services.threed_client_factory import create_3d_client
+from services.threed_client_factory import create_3d_client, shutdown_3d_client
 
 JOB_ID = "75520930-b7f2-4196-b111-9b6baba12c90"
 GENERATED_DIR = f"/workspace/SimpleMe/storage/generated/{JOB_ID}"
@@ -60,7 +60,7 @@ async def main():
     print(f"\n✅ Done! Check the GLB file in: {models_dir}")
 
     # Cleanup
-    await client.close()
+    await shutdown_3d_client()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,11 @@
+-- Migration: Add order_status_counts RPC for dashboard statistics
+-- Run this in Supabase SQL Editor
+
+-- Aggregate order counts server-side so only one row per status is returned
+CREATE OR REPLACE FUNCTION order_status_counts()
+RETURNS TABLE (status TEXT, count BIGINT) AS $$
+    SELECT o.status, count(*) FROM orders o GROUP BY o.status;
+$$ LANGUAGE sql STABLE;
+
+-- Verify
+SELECT * FROM order_status_counts();
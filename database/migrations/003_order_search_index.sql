@@ -0,0 +1,36 @@
+-- Migration: Indexed order search (full-text + trigram)
+-- Run this in Supabase SQL Editor
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Full-text search vector over the searchable customer/order fields
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS search_tsv tsvector
+    GENERATED ALWAYS AS (
+        to_tsvector('simple',
+            coalesce(customer_name, '') || ' ' ||
+            coalesce(customer_email, '') || ' ' ||
+            coalesce(order_number, ''))
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_orders_search_tsv ON orders USING gin(search_tsv);
+
+-- Trigram indexes keep substring (ILIKE '%q%') matches indexable
+CREATE INDEX IF NOT EXISTS idx_orders_customer_name_trgm ON orders USING gin(customer_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_email_trgm ON orders USING gin(customer_email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_orders_order_number_trgm ON orders USING gin(order_number gin_trgm_ops);
+
+-- Search orders by customer name, email or order number (newest first)
+CREATE OR REPLACE FUNCTION search_orders(q TEXT, p_limit INTEGER DEFAULT 50, p_offset INTEGER DEFAULT 0)
+RETURNS SETOF orders AS $$
+    SELECT *
+    FROM orders
+    WHERE search_tsv @@ websearch_to_tsquery('simple', q)
+       OR customer_name ILIKE '%' || q || '%'
+       OR customer_email ILIKE '%' || q || '%'
+       OR order_number ILIKE '%' || q || '%'
+    ORDER BY created_at DESC
+    LIMIT p_limit OFFSET p_offset;
+$$ LANGUAGE sql STABLE;
+
+-- Verify
+SELECT 'Order search index created successfully!' as message;
@@ -0,0 +1,31 @@
+-- Migration: Store order status as an enum and add status indexes
+-- Run this in Supabase SQL Editor
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'order_status') THEN
+        CREATE TYPE order_status AS ENUM ('pending', 'processing', 'completed', 'failed');
+    END IF;
+END $$;
+
+-- The enum replaces the CHECK constraint on the old TEXT column
+ALTER TABLE orders DROP CONSTRAINT IF EXISTS orders_status_check;
+ALTER TABLE orders ALTER COLUMN status DROP DEFAULT;
+ALTER TABLE orders ALTER COLUMN status TYPE order_status USING status::order_status;
+ALTER TABLE orders ALTER COLUMN status SET DEFAULT 'pending';
+
+-- Status-filtered listings sorted by newest first
+CREATE INDEX IF NOT EXISTS idx_orders_status_created_at ON orders(status, created_at DESC);
+
+-- Partial indexes for the dashboard's in-flight queues
+CREATE INDEX IF NOT EXISTS idx_orders_pending ON orders(created_at DESC) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_orders_processing ON orders(created_at DESC) WHERE status = 'processing';
+
+-- order_status_counts returns TEXT, so cast the enum
+CREATE OR REPLACE FUNCTION order_status_counts()
+RETURNS TABLE (status TEXT, count BIGINT) AS $$
+    SELECT o.status::text, count(*) FROM orders o GROUP BY o.status;
+$$ LANGUAGE sql STABLE;
+
+-- Verify
+SELECT * FROM order_status_counts();
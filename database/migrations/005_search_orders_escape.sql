@@ -0,0 +1,20 @@
+-- Migration: Match search_orders input literally
+-- Run this in Supabase SQL Editor
+
+-- Search orders by customer name, email or order number (newest first)
+CREATE OR REPLACE FUNCTION search_orders(q TEXT, p_limit INTEGER DEFAULT 50, p_offset INTEGER DEFAULT 0)
+RETURNS SETOF orders AS $$
+    SELECT o.*
+    FROM orders o,
+         -- Escape LIKE wildcards so user input is matched literally
+         LATERAL (SELECT '%' || replace(replace(replace(q, '\', '\\'), '%', '\%'), '_', '\_') || '%' AS pattern) p
+    WHERE o.search_tsv @@ websearch_to_tsquery('simple', q)
+       OR o.customer_name ILIKE p.pattern
+       OR o.customer_email ILIKE p.pattern
+       OR o.order_number ILIKE p.pattern
+    ORDER BY o.created_at DESC
+    LIMIT p_limit OFFSET p_offset;
+$$ LANGUAGE sql STABLE;
+
+-- Verify
+SELECT 'search_orders updated successfully!' as message;
@@ -1,6 +1,17 @@
 -- SimpleMe Orders Database Schema
 -- Run this in Supabase SQL Editor: https://supabase.com/dashboard/project/dhsblngaosaxxmwbiusa/sql
 
+-- Trigram support for indexed substring search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Order status enum
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'order_status') THEN
+        CREATE TYPE order_status AS ENUM ('pending', 'processing', 'completed', 'failed');
+    END IF;
+END $$;
+
 -- Create orders table
 CREATE TABLE IF NOT EXISTS orders (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
@@ -17,7 +28,7 @@ CREATE TABLE IF NOT EXISTS orders (
     customer_email TEXT,
 
     -- Order status
-    status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'processing', 'completed', 'failed')),
+    status order_status DEFAULT 'pending',
     error_message TEXT,
 
     -- Input data
@@ -47,7 +58,15 @@ CREATE TABLE IF NOT EXISTS orders (
 
     -- Timestamps
     created_at TIMESTAMPTZ DEFAULT NOW(),
-    updated_at TIMESTAMPTZ DEFAULT NOW()
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    -- Full-text search vector (customer name, email, order number)
+    search_tsv TSVECTOR GENERATED ALWAYS AS (
+        to_tsvector('simple',
+            coalesce(customer_name, '') || ' ' ||
+            coalesce(customer_email, '') || ' ' ||
+            coalesce(order_number, ''))
+    ) STORED
 );
 
 -- Create indexes for common queries
@@ -56,6 +75,17 @@ CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
 CREATE INDEX IF NOT EXISTS idx_orders_shopify_order_id ON orders(shopify_order_id);
 CREATE INDEX IF NOT EXISTS idx_orders_customer_email ON orders(customer_email);
 CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_status_created_at ON orders(status, created_at DESC);
+
+-- Partial indexes for the dashboard's in-flight queues
+CREATE INDEX IF NOT EXISTS idx_orders_pending ON orders(created_at DESC) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_orders_processing ON orders(created_at DESC) WHERE status = 'processing';
+
+-- Search indexes (full-text + trigram for substring matches)
+CREATE INDEX IF NOT EXISTS idx_orders_search_tsv ON orders USING gin(search_tsv);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_name_trgm ON orders USING gin(customer_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_email_trgm ON orders USING gin(customer_email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_orders_order_number_trgm ON orders USING gin(order_number gin_trgm_ops);
 
 -- Enable Row Level Security (RLS)
 ALTER TABLE orders ENABLE ROW LEVEL SECURITY;
@@ -82,5 +112,26 @@ CREATE TRIGGER update_orders_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Function to count orders by status (used for dashboard stats)
+CREATE OR REPLACE FUNCTION order_status_counts()
+RETURNS TABLE (status TEXT, count BIGINT) AS $$
+    SELECT o.status::text, count(*) FROM orders o GROUP BY o.status;
+$$ LANGUAGE sql STABLE;
+
+-- Function to search orders by customer name, email or order number (newest first)
+CREATE OR REPLACE FUNCTION search_orders(q TEXT, p_limit INTEGER DEFAULT 50, p_offset INTEGER DEFAULT 0)
+RETURNS SETOF orders AS $$
+    SELECT o.*
+    FROM orders o,
+         -- Escape LIKE wildcards so user input is matched literally
+         LATERAL (SELECT '%' || replace(replace(replace(q, '\', '\\'), '%', '\%'), '_', '\_') || '%' AS pattern) p
+    WHERE o.search_tsv @@ websearch_to_tsquery('simple', q)
+       OR o.customer_name ILIKE p.pattern
+       OR o.customer_email ILIKE p.pattern
+       OR o.order_number ILIKE p.pattern
+    ORDER BY o.created_at DESC
+    LIMIT p_limit OFFSET p_offset;
+$$ LANGUAGE sql STABLE;
+
 -- Verify table created
 SELECT 'Orders table created successfully!' as message;
@@ -5,7 +5,7 @@ from datetime import datetime
 from openai import AsyncOpenAI
 from config.settings import settings
 from services.background_remover import BackgroundRemover
-from services.threed_client_factory import create_3d_client
+from services.threed_client_factory import create_3d_client, shutdown_3d_client
 
 JOB_ID = "75520930-b7f2-4196-b111-9b6baba12c90"
 GENERATED_DIR = f"/workspace/SimpleMe/storage/generated/{JOB_ID}"
@@ -73,7 +73,7 @@ centered on white background, realistic leather texture, classic elegant style""
     else:
         print(f"\n❌ 3D conversion failed - no model returned")
 
-    await threed_client.close()
+    await shutdown_3d_client()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -152,6 +152,8 @@ class OrderProcessor:
         try:
             loop.run_until_complete(self._process_order(order_data))
         finally:
+            # Release the database connections bound to this thread's loop
+            loop.run_until_complete(get_supabase_client().close())
             loop.close()
 
     def _save_step_state(self, job_dir: str, step: int, state: Dict):
@@ -1,8 +1,10 @@
 import os
+import re
 import subprocess
 import asyncio
 import shutil
-from typing import List, Dict, Optional
+import time
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 import logging
 from pathlib import Path
@@ -25,6 +27,38 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Matches the accessory number in filenames like "accessory_2_3d.glb"
+_ACC_NUM_RE = re.compile(r'accessory_(\d+)')
+
+# Bytes handed to each os.sendfile call when copying job files
+_SENDFILE_CHUNK = 1 << 20
+
+
+def _sendfile_copy(src: str, dst: str) -> int:
+    """
+    Copy a file with zero-copy os.sendfile, preserving metadata like copy2
+
+    Falls back to shutil.copyfile where file-to-file sendfile is unavailable.
+
+    Returns:
+        Number of bytes copied
+    """
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+            offset = 0
+            while True:
+                sent = os.sendfile(out_fd, in_fd, offset, _SENDFILE_CHUNK)
+                if sent == 0:
+                    break
+                offset += sent
+    except (AttributeError, OSError):
+        shutil.copyfile(src, dst)
+        offset = os.path.getsize(dst)
+
+    shutil.copystat(src, dst)
+    return offset
+
 
 class StickerMakerService:
     """
@@ -42,6 +76,7 @@ class StickerMakerService:
         self.cut_smoothing = settings.STICKER_MAKER_CUT_SMOOTHING
         self.timeout = settings.STICKER_MAKER_TIMEOUT
         self.blender_exe = settings.BLENDER_EXECUTABLE
+        self.processed_path = settings.PROCESSED_PATH
 
         logger.info(f"✅ StickerMaker service initialized - Executable: {self.executable}")
         logger.info(f"   Working dir: {self.working_dir}")
@@ -71,11 +106,15 @@ class StickerMakerService:
             logger.info(f"   Models: {len(models_3d)}, Images: {len(processed_images)}")
 
             # Step 1: Prepare input directory with required files
+            # (the output directory for step 3 is created alongside it)
             logger.info(f"📁 Step 1: Preparing input files for job {job_id}")
-            prep_result = await self._prepare_sticker_inputs(
-                job_id=job_id,
-                models_3d=models_3d,
-                processed_images=processed_images
+            prep_result, _ = await asyncio.gather(
+                self._prepare_sticker_inputs(
+                    job_id=job_id,
+                    models_3d=models_3d,
+                    processed_images=processed_images
+                ),
+                asyncio.to_thread(os.makedirs, self._get_dest_dir(job_id), exist_ok=True)
             )
 
             if not prep_result["success"]:
@@ -159,56 +198,60 @@ class StickerMakerService:
             # Create input directory
             in_dir = os.path.join(self.working_dir, "jobs", job_id, "in")
             os.makedirs(in_dir, exist_ok=True)
-            logger.info(f"📁 Created input directory: {in_dir}")
+            logger.info("📁 Created input directory: %s", in_dir)
 
             files_prepared = []
 
-            # Organize models by type
-            organized = self._organize_models_by_type(models_3d)
+            # Organize models by type and map images to expected names
+            # (both stat the filesystem, so run them off the event loop)
+            organized, image_map = await asyncio.gather(
+                asyncio.to_thread(self._organize_models_by_type, models_3d),
+                asyncio.to_thread(self._map_images_to_names, processed_images)
+            )
+
+            # Queue copies as (expected_name, src, dst) and submit them as one batch
+            copies = []
 
             # Copy GLB files with expected names
-            logger.info(f"🔄 Copying GLB files...")
+            logger.info("🔄 Copying GLB files...")
 
             # 1. Base character GLB
             if organized['figure']:
                 src_glb = organized['figure']['model_path']
-                dst_glb = os.path.join(in_dir, "base_character_3d.glb")
                 if os.path.exists(src_glb):
-                    shutil.copy2(src_glb, dst_glb)
-                    files_prepared.append("base_character_3d.glb")
-                    logger.info(f"   ✅ Copied: base_character_3d.glb")
+                    copies.append(("base_character_3d.glb", src_glb,
+                                   os.path.join(in_dir, "base_character_3d.glb")))
                 else:
-                    logger.warning(f"   ⚠️ Source not found: {src_glb}")
+                    logger.warning("   ⚠️ Source not found: %s", src_glb)
             else:
-                logger.warning(f"   ⚠️ No base character found in models")
+                logger.warning("   ⚠️ No base character found in models")
 
             # 2. Accessory GLBs (accessory_1, accessory_2, accessory_3)
             for i, acc in enumerate(organized['accessories'][:3], 1):
                 src_glb = acc['model_path']
-                dst_glb = os.path.join(in_dir, f"accessory_{i}_3d.glb")
                 if os.path.exists(src_glb):
-                    shutil.copy2(src_glb, dst_glb)
-                    files_prepared.append(f"accessory_{i}_3d.glb")
-                    logger.info(f"   ✅ Copied: accessory_{i}_3d.glb")
+                    copies.append((f"accessory_{i}_3d.glb", src_glb,
+                                   os.path.join(in_dir, f"accessory_{i}_3d.glb")))
                 else:
-                    logger.warning(f"   ⚠️ Source not found: {src_glb}")
+                    logger.warning("   ⚠️ Source not found: %s", src_glb)
 
             # Copy PNG files (nobg versions) with expected names
-            logger.info(f"🔄 Copying PNG files (nobg versions)...")
-
-            # Map processed images to expected names
-            image_map = self._map_images_to_names(processed_images)
+            logger.info("🔄 Copying PNG files (nobg versions)...")
 
             for expected_name, src_path in image_map.items():
                 if src_path and os.path.exists(src_path):
-                    dst_png = os.path.join(in_dir, expected_name)
-                    shutil.copy2(src_path, dst_png)
-                    files_prepared.append(expected_name)
-                    logger.info(f"   ✅ Copied: {expected_name}")
+                    copies.append((expected_name, src_path, os.path.join(in_dir, expected_name)))
                 else:
-                    logger.warning(f"   ⚠️ Image not found for: {expected_name}")
+                    logger.warning("   ⚠️ Image not found for: %s", expected_name)
+
+            await self._copy_files([(src, dst) for _, src, dst in copies])
 
-            logger.info(f"✅ Prepared {len(files_prepared)} files in {in_dir}")
+            files_prepared.extend(expected_name for expected_name, _, _ in copies)
+            if logger.isEnabledFor(logging.INFO):
+                for expected_name in files_prepared:
+                    logger.info("   ✅ Copied: %s", expected_name)
+
+            logger.info("✅ Prepared %s files in %s", len(files_prepared), in_dir)
 
             return {
                 'success': True,
@@ -218,12 +261,27 @@ class StickerMakerService:
             }
 
         except Exception as e:
-            logger.error(f"❌ Error preparing inputs: {str(e)}")
+            logger.error("❌ Error preparing inputs: %s", e)
             return {
                 'success': False,
                 'error': str(e)
             }
 
+    def _get_dest_dir(self, job_id: str) -> str:
+        """Destination directory for a job's collected sticker outputs"""
+        return os.path.join(self.processed_path, job_id, "stickers")
+
+    async def _copy_files(self, pairs: List[Tuple[str, str]]) -> List[int]:
+        """
+        Copy a batch of (src, dst) files concurrently in worker threads
+
+        Returns:
+            Number of bytes copied for each pair, in input order
+        """
+        return await asyncio.gather(*[
+            asyncio.to_thread(_sendfile_copy, src, dst) for src, dst in pairs
+        ])
+
     def _organize_models_by_type(self, models_3d: List[Dict]) -> Dict:
         """
         Organize 3D models by type (figure vs accessories)
@@ -234,43 +292,31 @@ class StickerMakerService:
         Returns:
             Dict with 'figure' and 'accessories' lists
         """
-        organized = {
-            'figure': None,
-            'accessories': []
-        }
+        figure = None
+        accessories = []
 
+        # Single pass: classify each model once and tag accessories with
+        # their sort number (unknown patterns are treated as accessories)
         for model in models_3d:
-            model_path = model.get('model_path', '')
-            filename = os.path.basename(model_path)
+            filename = os.path.basename(model.get('model_path', ''))
 
-            # Check if this is the base character
             if 'base_character' in filename.lower():
-                organized['figure'] = model
-            # Check if this is an accessory
-            elif 'accessory_' in filename.lower():
-                organized['accessories'].append(model)
+                figure = model
             else:
-                # Unknown pattern, treat as accessory
-                organized['accessories'].append(model)
+                accessories.append((self._extract_accessory_number(filename), model))
 
-        # Sort accessories by number
-        organized['accessories'].sort(
-            key=lambda x: self._extract_accessory_number(x.get('model_path', ''))
-        )
+        # Sort accessories by number (stable, so ties keep input order)
+        accessories.sort(key=lambda pair: pair[0])
 
-        return organized
+        return {
+            'figure': figure,
+            'accessories': [model for _, model in accessories]
+        }
 
     def _extract_accessory_number(self, filepath: str) -> int:
         """Extract accessory number from filename"""
-        try:
-            filename = os.path.basename(filepath)
-            if 'accessory_' in filename:
-                parts = filename.split('accessory_')[1]
-                number_str = parts.split('_')[0]
-                return int(number_str)
-            return 999
-        except:
-            return 999
+        match = _ACC_NUM_RE.search(os.path.basename(filepath))
+        return int(match.group(1)) if match else 999
 
     def _map_images_to_names(self, processed_images: List[Dict]) -> Dict[str, Optional[str]]:
         """
@@ -323,7 +369,7 @@ class StickerMakerService:
             Dict with execution results
         """
         try:
-            logger.info(f"🚀 Executing PrintMaker for job {job_id}")
+            logger.info("🚀 Executing PrintMaker for job %s", job_id)
 
             # Build command
             cmd = [
@@ -336,10 +382,11 @@ class StickerMakerService:
                 "--cut_smoothing", str(self.cut_smoothing)
             ]
 
-            logger.info(f"   Command: {' '.join(cmd)}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("   Command: %s", ' '.join(cmd))
 
             # Execute with timeout
-            start_time = datetime.now()
+            start_time = time.monotonic()
 
             process = await asyncio.create_subprocess_exec(
                 *cmd,
@@ -358,17 +405,18 @@ class StickerMakerService:
                 await process.wait()
                 raise Exception(f"PrintMaker execution timed out after {self.timeout}s")
 
-            end_time = datetime.now()
-            execution_time = (end_time - start_time).total_seconds()
+            execution_time = time.monotonic() - start_time
 
-            # Decode output
-            stdout_text = stdout.decode('utf-8') if stdout else ''
-            stderr_text = stderr.decode('utf-8') if stderr else ''
+            # Decode output off the event loop (logs can be several MB)
+            stdout_text, stderr_text = await asyncio.gather(
+                asyncio.to_thread(bytes.decode, stdout or b'', 'utf-8', 'replace'),
+                asyncio.to_thread(bytes.decode, stderr or b'', 'utf-8', 'replace')
+            )
 
             # Check return code
             if process.returncode != 0:
-                logger.error(f"❌ PrintMaker failed with return code {process.returncode}")
-                logger.error(f"   STDERR: {stderr_text}")
+                logger.error("❌ PrintMaker failed with return code %s", process.returncode)
+                logger.error("   STDERR: %s", stderr_text)
                 return {
                     'success': False,
                     'error': f"PrintMaker returned code {process.returncode}",
@@ -377,7 +425,7 @@ class StickerMakerService:
                     'return_code': process.returncode
                 }
 
-            logger.info(f"✅ PrintMaker completed in {execution_time:.2f}s")
+            logger.info("✅ PrintMaker completed in %.2fs", execution_time)
 
             return {
                 'success': True,
@@ -385,11 +433,11 @@ class StickerMakerService:
                 'stderr': stderr_text,
                 'return_code': 0,
                 'execution_time': execution_time,
-                'completed_at': end_time.isoformat()
+                'completed_at': datetime.now().isoformat()
             }
 
         except Exception as e:
-            logger.error(f"❌ Error executing PrintMaker: {str(e)}")
+            logger.error("❌ Error executing PrintMaker: %s", e)
             return {
                 'success': False,
                 'error': str(e)
@@ -415,11 +463,11 @@ class StickerMakerService:
             out_dir = os.path.join(self.working_dir, "jobs", job_id, "out")
 
             # Destination directory (storage/processed)
-            dest_dir = os.path.join(settings.PROCESSED_PATH, job_id, "stickers")
+            dest_dir = self._get_dest_dir(job_id)
             os.makedirs(dest_dir, exist_ok=True)
 
-            logger.info(f"📦 Collecting outputs from: {out_dir}")
-            logger.info(f"   Destination: {dest_dir}")
+            logger.info("📦 Collecting outputs from: %s", out_dir)
+            logger.info("   Destination: %s", dest_dir)
 
             output_files = []
             # Mapping: source_name -> (destination_name, file_type)
@@ -442,49 +490,52 @@ class StickerMakerService:
                 'output_files': []
             }
 
+            # Copy every available output to storage (with potential rename) in one batch
+            found = []
             for src_name, (dst_name, file_type) in file_mapping.items():
                 src_path = os.path.join(out_dir, src_name)
-                dst_path = os.path.join(dest_dir, dst_name)
-
                 if os.path.exists(src_path):
-                    # Copy file to storage (with potential rename)
-                    shutil.copy2(src_path, dst_path)
-
-                    # Get file info
-                    file_size = os.path.getsize(dst_path)
-                    file_ext = os.path.splitext(dst_name)[1]
-
-                    file_info = {
-                        'filename': dst_name,
-                        'file_path': dst_path,
-                        'file_extension': file_ext,
-                        'file_size_bytes': file_size,
-                        'file_size_mb': round(file_size / (1024 * 1024), 2),
-                        'file_type': file_type,
-                        'download_url': f"/storage/processed/{job_id}/stickers/{dst_name}",
-                        'created_at': datetime.now().isoformat()
-                    }
-
-                    output_files.append(file_info)
-                    result[file_type] = dst_path
-
-                    logger.info(f"   ✅ Collected: {src_name} -> {dst_name} ({file_info['file_size_mb']} MB)")
+                    found.append((src_name, dst_name, file_type, src_path,
+                                  os.path.join(dest_dir, dst_name)))
                 else:
-                    logger.warning(f"   ⚠️ Source file not found: {src_path}")
+                    logger.warning("   ⚠️ Source file not found: %s", src_path)
+
+            file_sizes = await self._copy_files(
+                [(src_path, dst_path) for _, _, _, src_path, dst_path in found]
+            )
+
+            for (src_name, dst_name, file_type, _, dst_path), file_size in zip(found, file_sizes):
+                file_ext = os.path.splitext(dst_name)[1]
+
+                file_info = {
+                    'filename': dst_name,
+                    'file_path': dst_path,
+                    'file_extension': file_ext,
+                    'file_size_bytes': file_size,
+                    'file_size_mb': round(file_size / (1024 * 1024), 2),
+                    'file_type': file_type,
+                    'download_url': f"/storage/processed/{job_id}/stickers/{dst_name}",
+                    'created_at': datetime.now().isoformat()
+                }
+
+                output_files.append(file_info)
+                result[file_type] = dst_path
+
+                logger.info("   ✅ Collected: %s -> %s (%s MB)", src_name, dst_name, file_info['file_size_mb'])
 
             result['output_files'] = output_files
 
             if not output_files:
-                logger.error(f"❌ No output files found in {out_dir}")
+                logger.error("❌ No output files found in %s", out_dir)
                 result['success'] = False
                 result['error'] = "No output files generated"
             else:
-                logger.info(f"✅ Collected {len(output_files)} output files")
+                logger.info("✅ Collected %s output files", len(output_files))
 
             return result
 
         except Exception as e:
-            logger.error(f"❌ Error collecting outputs: {str(e)}")
+            logger.error("❌ Error collecting outputs: %s", e)
             return {
                 'success': False,
                 'error': str(e)
@@ -4,36 +4,484 @@ Supabase Client for Order Management
 Handles all database operations for orders.
 """
 
+import asyncio
+import copy
+import json
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime
-from supabase import create_client, Client
+import threading
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from datetime import date, datetime
+from uuid import UUID
+import httpx
+from cachetools import TTLCache
+from postgrest.types import CountMethod, ReturnMethod
+from supabase import create_async_client, AsyncClient
 from config.settings import settings
 
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
 logger = logging.getLogger(__name__)
 
+# Order lifecycle statuses (the order_status enum)
+_ORDER_STATUSES = ("pending", "processing", "completed", "failed")
+
+# Coalesced order inserts: flush after this many records or this many seconds
+_INSERT_BATCH_SIZE = 100
+_INSERT_BATCH_WINDOW = 0.05
+
+# Longest a caller waits for its queued insert before giving up
+_INSERT_TIMEOUT = 30.0
+
+# Columns of a full order row (everything but the search_tsv index column)
+_ORDER_COLUMNS = (
+    "id,shopify_order_id,order_number,job_id,customer_name,customer_email,status,error_message,"
+    "input_image_path,accessories,title,subtitle,text_color,background_type,background_color,"
+    "background_image_path,is_test,stl_path,texture_path,blend_path,stl_url,texture_url,blend_url,"
+    "created_at,updated_at"
+)
+
+# Columns written by create_order, in prepared-statement parameter order
+_INSERT_COLUMNS = (
+    "shopify_order_id", "order_number", "job_id", "customer_name", "customer_email",
+    "status", "input_image_path", "accessories", "title", "subtitle", "text_color",
+    "background_type", "background_color", "background_image_path", "is_test"
+)
+_INSERT_ORDER_SQL = (
+    f"INSERT INTO orders ({', '.join(_INSERT_COLUMNS)}) "
+    f"VALUES ({', '.join(f'${i}' for i in range(1, len(_INSERT_COLUMNS) + 1))}) RETURNING {_ORDER_COLUMNS}"
+)
+
+# Columns returned by list views (full rows only come from get_order)
+_LIST_COLUMNS = "id,job_id,order_number,customer_name,customer_email,status,is_test,created_at,updated_at"
+
+# Hard cap on rows returned by a single list/search page
+_MAX_PAGE_SIZE = 200
+
+# Longest search string passed to the search_orders RPC
+_MAX_SEARCH_LENGTH = 100
+
+# Columns list_orders may sort by, with their Postgres types (for keyset cursors).
+# All are nullable; NULLs sort as larger than any value, as Postgres does by default
+_SORTABLE_COLUMNS = {
+    "created_at": "timestamptz",
+    "updated_at": "timestamptz",
+    "status": "order_status",
+    "order_number": "text",
+    "customer_name": "text"
+}
+
+
+class _InsertPending(Exception):
+    """A queued insert timed out while its batch was already being written"""
+
+
+def _quote_filter_value(value: Any) -> str:
+    """Quote a value for a PostgREST logic filter (or=/and=), escaping backslashes and quotes"""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+async def _init_connection(conn) -> None:
+    """Decode json/jsonb columns to Python objects, matching PostgREST responses"""
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(
+            typename, encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        )
+
+
+def _record_to_dict(record) -> Dict:
+    """Convert an asyncpg Record to the JSON-style dict PostgREST would return"""
+    row = dict(record)
+    for key, value in row.items():
+        if isinstance(value, (datetime, date)):
+            row[key] = value.isoformat()
+        elif isinstance(value, UUID):
+            row[key] = str(value)
+    return row
+
+
+class _LoopState:
+    """Per-event-loop client state (asyncio and httpx objects are bound to one loop)"""
+
+    def __init__(self):
+        # The async client is created on first use, inside its event loop
+        self.client: Optional[AsyncClient] = None
+        self.orders = None  # Reusable "orders" table request builder
+        self.client_lock = asyncio.Lock()
+
+        # asyncpg pool (only ever created on the main thread's loop)
+        self.pool = None
+        self.pool_lock = asyncio.Lock()
+
+        # In-flight lookups per key, as (generation, future)
+        self.order_fetches: Dict[str, Tuple[int, asyncio.Future]] = {}
+        self.shopify_order_fetches: Dict[str, Tuple[int, asyncio.Future]] = {}
+
+        # Pending create_order inserts, batched by a background worker;
+        # inserting holds the futures of the batch being written
+        self.insert_queue: Optional[asyncio.Queue] = None
+        self.insert_worker: Optional[asyncio.Task] = None
+        self.inserting: Set[asyncio.Future] = set()
+
 
 class SupabaseClient:
-    """Client for Supabase database operations"""
+    """
+    Client for Supabase database operations
+
+    The app's event loop and each order-processing thread's loop get their
+    own HTTP client, locks and insert worker; the order caches are shared
+    by all of them.
+    """
 
     def __init__(self):
         self.url = settings.SUPABASE_URL
         self.key = settings.SUPABASE_SERVICE_KEY  # Use service key for server-side
-
-        if not self.url or not self.key:
+        self._configured = bool(self.url and self.key)
+
+        # Client state per event loop, dropped when a loop is garbage collected
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._loops_lock = threading.Lock()
+
+        # Optional direct Postgres pool (Supavisor/PgBouncer transaction pooler)
+        self.db_url = settings.SUPABASE_DB_URL
+        self._pool_failed = False
+
+        # Short-lived order lookup caches, invalidated on every write by job_id.
+        # Bumping the generation on every write keeps racing fetches out of
+        # the caches. Guarded by a thread lock, as every loop shares them.
+        self._order_cache: TTLCache = TTLCache(maxsize=1024, ttl=30)
+        self._shopify_order_cache: TTLCache = TTLCache(maxsize=1024, ttl=30)
+        self._order_generation = 0
+        self._cache_lock = threading.Lock()
+
+        if not self._configured:
             logger.warning("⚠️ Supabase credentials not configured")
-            self.client = None
-        else:
-            try:
-                self.client: Client = create_client(self.url, self.key)
-                logger.info(f"✅ Supabase client initialized: {self.url}")
-            except Exception as e:
-                logger.error(f"❌ Failed to initialize Supabase client: {e}")
-                self.client = None
 
     def is_connected(self) -> bool:
         """Check if Supabase client is connected"""
-        return self.client is not None
+        return self._configured
+
+    def _state(self) -> _LoopState:
+        """Get the client state for the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._loops_lock:
+            state = self._loops.get(loop)
+            if state is None:
+                state = self._loops[loop] = _LoopState()
+        return state
+
+    @property
+    def _orders(self):
+        """The running loop's "orders" table request builder"""
+        return self._state().orders
+
+    async def _get_client(self) -> Optional[AsyncClient]:
+        """Get the running loop's async Supabase client, creating it on first use"""
+        state = self._state()
+        if state.client is None and self._configured:
+            async with state.client_lock:
+                if state.client is None:
+                    try:
+                        client = await create_async_client(self.url, self.key)
+                        await self._configure_http_session(client)
+                        # Request builders only hold the session and path, so reuse one
+                        state.orders = client.table("orders")
+                        state.client = client
+                        logger.info(f"✅ Supabase client initialized: {self.url}")
+                    except Exception as e:
+                        logger.error(f"❌ Failed to initialize Supabase client: {e}")
+                        self._configured = False
+        return state.client
+
+    async def _configure_http_session(self, client: AsyncClient) -> None:
+        """
+        Replace the PostgREST HTTP session with a pooled HTTP/2 keep-alive client
+
+        Concurrent queries then multiplex over a few long-lived TLS connections
+        instead of paying a handshake on cold connections. Everything else
+        (timeout, TLS verification, redirects, auth, proxy) is carried over
+        from the session postgrest built.
+        """
+        postgrest = client.postgrest
+        session = postgrest.session
+        options = {}
+        # verify/proxy live on the transport, so read what postgrest was given
+        proxy = getattr(postgrest, "proxy", None)
+        if proxy:
+            options["proxy"] = proxy
+        postgrest.session = httpx.AsyncClient(
+            base_url=session.base_url,
+            headers=session.headers,
+            params=session.params,
+            cookies=session.cookies,
+            auth=session.auth,
+            timeout=session.timeout,
+            follow_redirects=session.follow_redirects,
+            event_hooks=session.event_hooks,
+            trust_env=session.trust_env,
+            verify=getattr(postgrest, "verify", True),
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=20,
+                max_connections=40,
+                keepalive_expiry=60.0
+            ),
+            **options
+        )
+        await session.aclose()
+
+    async def _get_pool(self):
+        """
+        Get the running loop's asyncpg connection pool, creating it on first use
+
+        Returns None when SUPABASE_DB_URL is unset, asyncpg is not installed,
+        the pool could not be created, or the caller is not on the main
+        thread; callers then fall back to PostgREST. Order-processing threads
+        each run a short-lived loop of their own, so only the app's loop
+        keeps a pool. Prepared statements are disabled so the pool works
+        behind Supavisor or PgBouncer in transaction mode.
+        """
+        if not self.db_url or asyncpg is None or self._pool_failed:
+            return None
+        if threading.current_thread() is not threading.main_thread():
+            return None
+
+        state = self._state()
+        if state.pool is None:
+            async with state.pool_lock:
+                if state.pool is None and not self._pool_failed:
+                    try:
+                        state.pool = await asyncpg.create_pool(
+                            dsn=self.db_url,
+                            min_size=3,
+                            max_size=15,
+                            max_inactive_connection_lifetime=1800,
+                            statement_cache_size=0,
+                            server_settings={"jit": "off"},
+                            init=_init_connection
+                        )
+                        logger.info("✅ Postgres connection pool initialized")
+                    except Exception as e:
+                        logger.error(f"❌ Failed to create Postgres pool, using PostgREST: {e}")
+                        self._pool_failed = True
+        return state.pool
+
+    async def _insert_records(self, records: List[Dict]) -> List[Dict]:
+        """Insert order records in a single request and return the created rows"""
+        pool = await self._get_pool()
+        if pool:
+            # Binary protocol with one prepared plan, inside a single transaction
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    stmt = await conn.prepare(_INSERT_ORDER_SQL)
+                    rows = [
+                        await stmt.fetchrow(*(record[column] for column in _INSERT_COLUMNS))
+                        for record in records
+                    ]
+            return [_record_to_dict(row) for row in rows]
+
+        query = self._orders.insert(records)
+        # PostgREST honours select= on inserts, so search_tsv isn't sent back
+        query.params = query.params.add("select", _ORDER_COLUMNS)
+        result = await query.execute()
+        return result.data or []
+
+    async def _enqueue_insert(self, record: Dict) -> Optional[Dict]:
+        """Queue an order insert for this loop's batch worker and wait for its row"""
+        state = self._state()
+        if state.insert_queue is None:
+            state.insert_queue = asyncio.Queue()
+        if state.insert_worker is None or state.insert_worker.done():
+            # Restarted on the same queue, so nothing already queued is lost
+            state.insert_worker = asyncio.create_task(self._run_insert_worker(state))
+
+        future = asyncio.get_running_loop().create_future()
+        state.insert_queue.put_nowait((record, future))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), _INSERT_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if isinstance(e, asyncio.CancelledError):
+                if future not in state.inserting:
+                    future.cancel()
+                raise
+            if future not in state.inserting:
+                # Still queued: drop it, so a failed caller never gets a row written later
+                future.cancel()
+                raise asyncio.TimeoutError(f"Order insert timed out after {_INSERT_TIMEOUT}s") from e
+            raise _InsertPending() from e
+
+    async def _run_insert_worker(self, state: _LoopState) -> None:
+        """
+        Collect queued inserts into batches and write each batch in one request
+
+        A lone insert is written at once; only a burst (more already queued)
+        waits up to _INSERT_BATCH_WINDOW to fill its batch. Items whose
+        caller already gave up are skipped. A None item, queued by close(),
+        stops the worker after the batch it ends. If the worker dies, every
+        caller it still owes a row gets the error.
+        """
+        loop = asyncio.get_running_loop()
+        queue = state.insert_queue
+        batch = []
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                stop = False
+
+                if not queue.empty():
+                    deadline = loop.time() + _INSERT_BATCH_WINDOW
+                    while len(batch) < _INSERT_BATCH_SIZE:
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        try:
+                            item = await asyncio.wait_for(queue.get(), timeout)
+                        except asyncio.TimeoutError:
+                            break
+                        if item is None:
+                            stop = True
+                            break
+                        batch.append(item)
+
+                batch = [(record, future) for record, future in batch if not future.done()]
+                if batch:
+                    state.inserting.update(future for _, future in batch)
+                    try:
+                        await self._flush_inserts(batch)
+                    finally:
+                        state.inserting.difference_update(future for _, future in batch)
+                batch = []
+                if stop:
+                    return
+        except BaseException as e:
+            error = e if isinstance(e, Exception) else RuntimeError("Order insert worker stopped")
+            while not queue.empty():
+                item = queue.get_nowait()
+                if item is not None:
+                    batch.append(item)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            if error is not e:
+                raise
+            logger.error(f"❌ Order insert worker failed: {e}")
+
+    async def _flush_inserts(self, batch: List) -> None:
+        """Insert a batch and resolve each caller's future with its row"""
+        try:
+            rows = await self._insert_records([record for record, _ in batch])
+        except Exception as e:
+            if len(batch) > 1:
+                # One bad record (e.g. duplicate job_id) must not fail the others
+                logger.warning(f"⚠️ Batch insert of {len(batch)} orders failed, retrying individually: {e}")
+                for item in batch:
+                    await self._flush_inserts([item])
+                return
+            _, future = batch[0]
+            if not future.done():
+                future.set_exception(e)
+            return
+
+        for i, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(rows[i] if i < len(rows) else None)
+
+    async def close(self) -> None:
+        """
+        Write this loop's queued order inserts and close its connections
+
+        Call from every event loop that used the client before that loop is
+        closed: the app's shutdown handler and each order-processing thread.
+        """
+        loop = asyncio.get_running_loop()
+        with self._loops_lock:
+            state = self._loops.get(loop)
+        if state is None:
+            return
+
+        worker, state.insert_worker = state.insert_worker, None
+        if worker is not None and not worker.done():
+            state.insert_queue.put_nowait(None)
+            try:
+                # On timeout the worker is cancelled and fails what's left
+                await asyncio.wait_for(worker, _INSERT_TIMEOUT)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+
+        with self._loops_lock:
+            self._loops.pop(loop, None)
+        if state.pool is not None:
+            await state.pool.close()
+        if state.client is not None:
+            await state.client.postgrest.aclose()
+            await state.client.auth.close()
+
+    def _invalidate_order(self, job_id: str) -> None:
+        """Drop cached lookups for an order after it changes"""
+        with self._cache_lock:
+            self._order_generation += 1
+            self._order_cache.pop(job_id, None)
+            stale = [key for key, order in self._shopify_order_cache.items()
+                     if order.get("job_id") == job_id]
+            for key in stale:
+                self._shopify_order_cache.pop(key, None)
+
+    async def _cached_order(
+        self,
+        cache: TTLCache,
+        fetches: Dict[str, Tuple[int, asyncio.Future]],
+        key: str,
+        fetch: Callable[[], Awaitable[Optional[Dict]]]
+    ) -> Optional[Dict]:
+        """
+        Look up an order through a TTL cache, sharing one fetch per key
+
+        Concurrent misses for the same key wait on a single query; misses for
+        other keys don't wait at all. A fetch that overlapped a write is
+        returned but not cached, so it cannot pin a pre-write row for the TTL.
+        Callers always get a deep copy of the cached row.
+        """
+        with self._cache_lock:
+            order = cache.get(key)
+            generation = self._order_generation
+        if order is None:
+            inflight = fetches.get(key)
+            if inflight is None or inflight[0] != generation:
+                inflight = (generation, asyncio.ensure_future(fetch()))
+                fetches[key] = inflight
+
+                def _done(_future, entry=inflight):
+                    if fetches.get(key) is entry:
+                        del fetches[key]
+
+                inflight[1].add_done_callback(_done)
+
+            # Shielded: one cancelled caller must not cancel the others' fetch
+            order = await asyncio.shield(inflight[1])
+            with self._cache_lock:
+                if order is not None and self._order_generation == generation:
+                    cache[key] = order
+
+        return copy.deepcopy(order) if order is not None else None
+
+    async def _pool_update(self, pool, job_id: str, update_data: Dict) -> None:
+        """Update an order by job_id through the pool (no rows returned)"""
+        assignments = ", ".join(f"{column} = ${i}" for i, column in enumerate(update_data, 2))
+
+        async with pool.acquire() as conn:
+            await conn.execute(
+                f"UPDATE orders SET {assignments} WHERE job_id = $1",
+                job_id, *update_data.values()
+            )
 
     # ============================================================
     # ORDER OPERATIONS
@@ -53,9 +501,11 @@ class SupabaseClient:
             }
 
         Returns:
-            Created order record or error
+            Created order record or error. If the insert was still being
+            written after _INSERT_TIMEOUT, pending is True and data is None.
         """
-        if not self.client:
+        client = await self._get_client()
+        if not client:
             logger.error("❌ Supabase client not initialized")
             return {"success": False, "error": "Database not connected"}
 
@@ -76,15 +526,23 @@ class SupabaseClient:
                 "background_type": order_data.get("background_type", "transparent"),
                 "background_color": order_data.get("background_color", "white"),
                 "background_image_path": order_data.get("background_image_path"),
-                "is_test": order_data.get("is_test", False),
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                "is_test": order_data.get("is_test", False)
+                # created_at / updated_at come from the column DEFAULT now()
             }
 
-            result = self.client.table("orders").insert(record).execute()
+            if record["is_test"]:
+                # Test orders skip the coalescing queue
+                rows = await self._insert_records([record])
+                row = rows[0] if rows else None
+            else:
+                row = await self._enqueue_insert(record)
 
             logger.info(f"✅ Order created: {order_data.get('job_id')}")
-            return {"success": True, "data": result.data[0] if result.data else None}
+            return {"success": True, "data": row}
+
+        except _InsertPending:
+            logger.warning(f"⚠️ Order {order_data.get('job_id')} insert still in progress after {_INSERT_TIMEOUT}s")
+            return {"success": True, "pending": True, "data": None}
 
         except Exception as e:
             logger.error(f"❌ Failed to create order: {e}")
@@ -92,21 +550,27 @@ class SupabaseClient:
 
     async def update_order_status(self, job_id: str, status: str, error: str = None) -> Dict:
         """Update order status"""
-        if not self.client:
+        client = await self._get_client()
+        if not client:
             return {"success": False, "error": "Database not connected"}
 
         try:
-            update_data = {
-                "status": status,
-                "updated_at": datetime.now().isoformat()
-            }
+            # updated_at is set by the update_orders_updated_at trigger
+            update_data = {"status": status}
             if error:
                 update_data["error_message"] = error
 
-            result = self.client.table("orders").update(update_data).eq("job_id", job_id).execute()
+            pool = await self._get_pool()
+            if pool:
+                await self._pool_update(pool, job_id, update_data)
+            else:
+                await self._orders.update(
+                    update_data, returning=ReturnMethod.minimal
+                ).eq("job_id", job_id).execute()
 
+            self._invalidate_order(job_id)
             logger.info(f"✅ Order {job_id} status updated to: {status}")
-            return {"success": True, "data": result.data}
+            return {"success": True}
 
         except Exception as e:
             logger.error(f"❌ Failed to update order status: {e}")
@@ -123,7 +587,8 @@ class SupabaseClient:
                 stl_url, texture_url, blend_url
             }
         """
-        if not self.client:
+        client = await self._get_client()
+        if not client:
             return {"success": False, "error": "Database not connected"}
 
         try:
@@ -134,14 +599,20 @@ class SupabaseClient:
                 "stl_url": outputs.get("stl_url"),
                 "texture_url": outputs.get("texture_url"),
                 "blend_url": outputs.get("blend_url"),
-                "status": "completed",
-                "updated_at": datetime.now().isoformat()
-            }
+                "status": "completed"
+            }  # updated_at is set by the update_orders_updated_at trigger
 
-            result = self.client.table("orders").update(update_data).eq("job_id", job_id).execute()
+            pool = await self._get_pool()
+            if pool:
+                await self._pool_update(pool, job_id, update_data)
+            else:
+                await self._orders.update(
+                    update_data, returning=ReturnMethod.minimal
+                ).eq("job_id", job_id).execute()
 
+            self._invalidate_order(job_id)
             logger.info(f"✅ Order {job_id} outputs updated")
-            return {"success": True, "data": result.data}
+            return {"success": True}
 
         except Exception as e:
             logger.error(f"❌ Failed to update order outputs: {e}")
@@ -149,14 +620,26 @@ class SupabaseClient:
 
     async def get_order(self, job_id: str) -> Dict:
         """Get order by job_id"""
-        if not self.client:
+        client = await self._get_client()
+        if not client:
             return {"success": False, "error": "Database not connected"}
 
+        async def fetch() -> Optional[Dict]:
+            pool = await self._get_pool()
+            if pool:
+                async with pool.acquire() as conn:
+                    row = await conn.fetchrow(f"SELECT {_ORDER_COLUMNS} FROM orders WHERE job_id = $1", job_id)
+                return _record_to_dict(row) if row else None
+            result = await self._orders.select(_ORDER_COLUMNS).eq("job_id", job_id).execute()
+            return result.data[0] if result.data else None
+
         try:
-            result = self.client.table("orders").select("*").eq("job_id", job_id).execute()
+            order = await self._cached_order(
+                self._order_cache, self._state().order_fetches, job_id, fetch
+            )
 
-            if result.data:
-                return {"success": True, "data": result.data[0]}
+            if order:
+                return {"success": True, "data": order}
             else:
                 return {"success": False, "error": "Order not found"}
 
@@ -164,16 +647,86 @@ class SupabaseClient:
             logger.error(f"❌ Failed to get order: {e}")
             return {"success": False, "error": str(e)}
 
+    async def get_orders(self, job_ids: List[str]) -> Dict:
+        """
+        Get several orders by job_id in one round trip
+
+        Cached orders are served from memory; the rest are fetched with a
+        single IN query and cached for later get_order calls.
+
+        Args:
+            job_ids: Job IDs to look up
+
+        Returns:
+            Dict with data mapping job_id -> order (missing orders are omitted)
+        """
+        client = await self._get_client()
+        if not client:
+            return {"success": False, "error": "Database not connected"}
+
+        orders = {}
+        missing = []
+        with self._cache_lock:
+            generation = self._order_generation
+            for job_id in dict.fromkeys(job_ids):
+                order = self._order_cache.get(job_id)
+                if order is not None:
+                    orders[job_id] = order
+                else:
+                    missing.append(job_id)
+        orders = {job_id: copy.deepcopy(order) for job_id, order in orders.items()}
+
+        try:
+            if missing:
+                pool = await self._get_pool()
+                if pool:
+                    async with pool.acquire() as conn:
+                        rows = await conn.fetch(
+                            f"SELECT {_ORDER_COLUMNS} FROM orders WHERE job_id = ANY($1::text[])", missing
+                        )
+                    data = [_record_to_dict(row) for row in rows]
+                else:
+                    result = await self._orders.select(_ORDER_COLUMNS).in_("job_id", missing).execute()
+                    data = result.data
+
+                with self._cache_lock:
+                    # Rows fetched across a write may predate it; don't cache them
+                    if self._order_generation == generation:
+                        for order in data:
+                            self._order_cache[order["job_id"]] = order
+                for order in data:
+                    orders[order["job_id"]] = copy.deepcopy(order)
+
+            return {"success": True, "data": orders}
+
+        except Exception as e:
+            logger.error(f"❌ Failed to get orders: {e}")
+            return {"success": False, "error": str(e)}
+
     async def get_order_by_shopify_id(self, shopify_order_id: str) -> Dict:
         """Get order by Shopify order ID"""
-        if not self.client:
+        client = await self._get_client()
+        if not client:
             return {"success": False, "error": "Database not connected"}
 
+        async def fetch() -> Optional[Dict]:
+            pool = await self._get_pool()
+            if pool:
+                async with pool.acquire() as conn:
+                    row = await conn.fetchrow(
+                        f"SELECT {_ORDER_COLUMNS} FROM orders WHERE shopify_order_id = $1 LIMIT 1", shopify_order_id
+                    )
+                return _record_to_dict(row) if row else None
+            result = await self._orders.select(_ORDER_COLUMNS).eq("shopify_order_id", shopify_order_id).execute()
+            return result.data[0] if result.data else None
+
         try:
-            result = self.client.table("orders").select("*").eq("shopify_order_id", shopify_order_id).execute()
+            order = await self._cached_order(
+                self._shopify_order_cache, self._state().shopify_order_fetches, shopify_order_id, fetch
+            )
 
-            if result.data:
-                return {"success": True, "data": result.data[0]}
+            if order:
+                return {"success": True, "data": order}
             else:
                 return {"success": False, "error": "Order not found"}
 
@@ -185,52 +738,190 @@ class SupabaseClient:
         self,
         status: str = None,
         limit: int = 50,
-        offset: int = 0,
+        after: Optional[Tuple[Any, str]] = None,
         order_by: str = "created_at",
         ascending: bool = False
     ) -> Dict:
         """
-        List orders with optional filtering
+        List orders with optional filtering, using keyset pagination
 
         Args:
             status: Filter by status (pending, processing, completed, failed)
-            limit: Max number of records
-            offset: Pagination offset
-            order_by: Column to sort by
+            limit: Max number of records (capped at _MAX_PAGE_SIZE)
+            after: Cursor from a previous page's next_cursor, as (order_by value, id)
+            order_by: Column to sort by (one of _SORTABLE_COLUMNS); NULLs come
+                last ascending and first descending
             ascending: Sort direction
+
+        Returns:
+            Dict with data, count and next_cursor (None on the last page)
         """
-        if not self.client:
+        client = await self._get_client()
+        if not client:
             return {"success": False, "error": "Database not connected"}
 
-        try:
-            query = self.client.table("orders").select("*")
+        if order_by not in _SORTABLE_COLUMNS:
+            return {"success": False, "error": f"Cannot sort orders by: {order_by}"}
 
-            if status:
-                query = query.eq("status", status)
+        limit = min(limit, _MAX_PAGE_SIZE)
 
-            query = query.order(order_by, desc=not ascending)
-            query = query.range(offset, offset + limit - 1)
+        if after:
+            value, last_id = after
+            try:
+                last_id = str(UUID(str(last_id)))
+            except ValueError:
+                return {"success": False, "error": "Invalid cursor"}
 
-            result = query.execute()
+        try:
+            pool = await self._get_pool()
+            if pool:
+                direction = "ASC" if ascending else "DESC"
+                conditions = []
+                args: List[Any] = [limit]
+                if status:
+                    args.append(status)
+                    conditions.append(f"status = ${len(args)}")
+                if after:
+                    args.append(last_id)
+                    id_arg = f"${len(args)}::text::uuid"
+                    if value is None:
+                        # Past the NULLs: only NULL rows after the cursor id (ascending),
+                        # or those plus every non-NULL row (descending)
+                        conditions.append(
+                            f"({order_by} IS NULL AND id > {id_arg})" if ascending
+                            else f"({order_by} IS NOT NULL OR id < {id_arg})"
+                        )
+                    else:
+                        args.append(str(value))
+                        row = (
+                            f"({order_by}, id) {'>' if ascending else '<'} "
+                            f"(${len(args)}::text::{_SORTABLE_COLUMNS[order_by]}, {id_arg})"
+                        )
+                        conditions.append(f"({row} OR {order_by} IS NULL)" if ascending else row)
+                where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+                async with pool.acquire() as conn:
+                    rows = await conn.fetch(
+                        f"SELECT {_LIST_COLUMNS} FROM orders {where} "
+                        f"ORDER BY {order_by} {direction}, id {direction} LIMIT $1",
+                        *args
+                    )
+                data = [_record_to_dict(row) for row in rows]
+            else:
+                query = self._orders.select(_LIST_COLUMNS)
+
+                if status:
+                    query = query.eq("status", status)
+
+                if after:
+                    op = "gt" if ascending else "lt"
+                    if value is None:
+                        if ascending:
+                            query = query.is_(order_by, "null").gt("id", last_id)
+                        else:
+                            query = query.or_(
+                                f"{order_by}.not.is.null,and({order_by}.is.null,id.lt.{last_id})"
+                            )
+                    else:
+                        quoted = _quote_filter_value(value)
+                        filters = f"{order_by}.{op}.{quoted},and({order_by}.eq.{quoted},id.{op}.{last_id})"
+                        if ascending:
+                            filters += f",{order_by}.is.null"
+                        query = query.or_(filters)
+
+                query = query.order(order_by, desc=not ascending).order("id", desc=not ascending)
+                query = query.limit(limit)
+
+                result = await query.execute()
+                data = result.data
+
+            next_cursor = None
+            if len(data) == limit:
+                next_cursor = (data[-1][order_by], data[-1]["id"])
 
             return {
                 "success": True,
-                "data": result.data,
-                "count": len(result.data)
+                "data": data,
+                "count": len(data),
+                "next_cursor": next_cursor
             }
 
         except Exception as e:
             logger.error(f"❌ Failed to list orders: {e}")
             return {"success": False, "error": str(e)}
 
+    async def iter_orders(
+        self,
+        status: str = None,
+        page_size: int = _MAX_PAGE_SIZE,
+        order_by: str = "created_at",
+        ascending: bool = False
+    ) -> AsyncIterator[Dict]:
+        """
+        Iterate over all matching orders, one keyset page at a time
+
+        Memory stays bounded by page_size, so exports and sync jobs can walk
+        the whole table: ``async for order in client.iter_orders(): ...``
+
+        Args:
+            status: Filter by status (pending, processing, completed, failed)
+            page_size: Rows fetched per round trip (capped at _MAX_PAGE_SIZE)
+            order_by: Column to sort by (one of _SORTABLE_COLUMNS)
+            ascending: Sort direction
+        """
+        after = None
+        while True:
+            page = await self.list_orders(
+                status=status,
+                limit=page_size,
+                after=after,
+                order_by=order_by,
+                ascending=ascending
+            )
+            if not page.get("success"):
+                raise Exception(f"Failed to list orders: {page.get('error')}")
+
+            for order in page["data"]:
+                yield order
+
+            after = page["next_cursor"]
+            if after is None:
+                break
+
+    async def _count_status(self, status: str) -> int:
+        """Count orders with a status (the count comes back in Content-Range; at most one id is sent)"""
+        result = await self._orders.select("id", count=CountMethod.exact).eq("status", status).limit(1).execute()
+        return result.count or 0
+
     async def get_order_stats(self) -> Dict:
         """Get order statistics"""
-        if not self.client:
+        client = await self._get_client()
+        if not client:
             return {"success": False, "error": "Database not connected"}
 
         try:
-            # Get counts by status
-            all_orders = self.client.table("orders").select("status").execute()
+            # Get counts by status (aggregated server-side, one row per status)
+            pool = await self._get_pool()
+            if pool:
+                async with pool.acquire() as conn:
+                    rows = await conn.fetch(
+                        "SELECT status::text AS status, count(*) AS count FROM orders GROUP BY status"
+                    )
+                counts = [dict(row) for row in rows]
+            else:
+                try:
+                    result = await client.rpc("order_status_counts").execute()
+                    counts = result.data or []
+                except Exception as e:
+                    # RPC not deployed: count each status concurrently instead
+                    logger.warning(f"⚠️ order_status_counts RPC unavailable, counting per status: {e}")
+                    status_counts = await asyncio.gather(
+                        *[self._count_status(status) for status in _ORDER_STATUSES]
+                    )
+                    counts = [
+                        {"status": status, "count": count}
+                        for status, count in zip(_ORDER_STATUSES, status_counts)
+                    ]
 
             stats = {
                 "total": 0,
@@ -240,11 +931,10 @@ class SupabaseClient:
                 "failed": 0
             }
 
-            for order in all_orders.data:
-                stats["total"] += 1
-                status = order.get("status", "pending")
-                if status in stats:
-                    stats[status] += 1
+            for row in counts:
+                stats["total"] += row["count"]
+                if row["status"] in stats:
+                    stats[row["status"]] += row["count"]
 
             return {"success": True, "data": stats}
 
@@ -254,29 +944,47 @@ class SupabaseClient:
 
     async def delete_order(self, job_id: str) -> Dict:
         """Delete an order"""
-        if not self.client:
+        client = await self._get_client()
+        if not client:
             return {"success": False, "error": "Database not connected"}
 
         try:
-            result = self.client.table("orders").delete().eq("job_id", job_id).execute()
+            await self._orders.delete(returning=ReturnMethod.minimal).eq("job_id", job_id).execute()
 
+            self._invalidate_order(job_id)
             logger.info(f"✅ Order {job_id} deleted")
-            return {"success": True, "data": result.data}
+            return {"success": True}
 
         except Exception as e:
             logger.error(f"❌ Failed to delete order: {e}")
             return {"success": False, "error": str(e)}
 
-    async def search_orders(self, query: str) -> Dict:
-        """Search orders by customer name or email"""
-        if not self.client:
+    async def search_orders(self, query: str, limit: int = 50, offset: int = 0) -> Dict:
+        """
+        Search orders by customer name, email or order number (newest first)
+
+        Args:
+            query: Search text
+            limit: Max number of records (capped at _MAX_PAGE_SIZE)
+            offset: Pagination offset
+        """
+        client = await self._get_client()
+        if not client:
             return {"success": False, "error": "Database not connected"}
 
+        query = query.strip()[:_MAX_SEARCH_LENGTH]
+        if not query:
+            return {"success": True, "data": [], "count": 0}
+
         try:
-            # Search in customer_name and customer_email
-            result = self.client.table("orders").select("*").or_(
-                f"customer_name.ilike.%{query}%,customer_email.ilike.%{query}%,order_number.ilike.%{query}%"
-            ).execute()
+            # Full-text + trigram search over customer_name, customer_email and
+            # order_number; the query is bound as an RPC parameter, never
+            # interpolated into a filter string (see database/migrations/005)
+            result = await client.rpc("search_orders", {
+                "q": query,
+                "p_limit": min(limit, _MAX_PAGE_SIZE),
+                "p_offset": offset
+            }).select(_ORDER_COLUMNS).execute()
 
             return {"success": True, "data": result.data, "count": len(result.data)}
 
@@ -1,23 +1,59 @@
 """
 3D Client Factory - Creates the appropriate 3D generation client based on settings
 """
-from typing import Union
+import logging
+import sys
+import threading
+from typing import TYPE_CHECKING, Union
 from config.settings import settings
 
+if TYPE_CHECKING:
+    from services.hunyuan3d_client import Hunyuan3DClient
+    from services.tripo3d_client import Tripo3DClient
+
+logger = logging.getLogger(__name__)
+
+# Singleton instance, shared by the app and its request handlers
+_client = None
+_client_lock = threading.Lock()
+
 
 def create_3d_client() -> Union["Hunyuan3DClient", "Tripo3DClient"]:
-    """Create the appropriate 3D generation client based on THREED_PROVIDER setting
+    """Get or create the 3D generation client for the THREED_PROVIDER setting
+
+    The client is created once per process; later calls return the same
+    instance.
 
     Returns:
         Either Hunyuan3DClient or Tripo3DClient instance
     """
-    provider = getattr(settings, 'THREED_PROVIDER', 'hunyuan').lower()
-
-    if provider == 'tripo3d':
-        from services.tripo3d_client import Tripo3DClient
-        print(f"Using Tripo3D for 3D generation (model: {settings.TRIPO3D_MODEL_VERSION})")
-        return Tripo3DClient()
-    else:
-        from services.hunyuan3d_client import Hunyuan3DClient
-        print(f"Using Hunyuan3D for 3D generation (API: {settings.HUNYUAN3D_API_URL})")
-        return Hunyuan3DClient()
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            provider = getattr(settings, 'THREED_PROVIDER', 'hunyuan').lower()
+
+            if provider == 'tripo3d':
+                from services.tripo3d_client import Tripo3DClient
+                logger.info(f"Using Tripo3D for 3D generation (model: {settings.TRIPO3D_MODEL_VERSION})")
+                _client = Tripo3DClient()
+            else:
+                from services.hunyuan3d_client import Hunyuan3DClient
+                logger.info(f"Using Hunyuan3D for 3D generation (API: {settings.HUNYUAN3D_API_URL})")
+                _client = Hunyuan3DClient()
+
+    return _client
+
+
+async def shutdown_3d_client():
+    """Stop the singleton client and close the running loop's connection pool
+
+    Call from the app's shutdown handler, or at the end of a script.
+    """
+    if _client is not None:
+        await _client.close()
+    tripo3d = sys.modules.get("services.tripo3d_client")
+    if tripo3d is not None:
+        await tripo3d.shutdown()
@@ -5,16 +5,216 @@ API Documentation: https://platform.tripo3d.ai/docs
 UPDATED: Added image preprocessing for better face quality
 """
 import httpx
+import orjson
 import asyncio
+import hashlib
 import os
 import logging
-from typing import List, Dict, Optional
+import random
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, List, Dict, Optional, Tuple
 from datetime import datetime
-import aiofiles
+from uuid import uuid4
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Invalid key, out of credits, or forbidden - retrying cannot succeed
+_PERMANENT_STATUS_CODES = (401, 402, 403)
+
+# Uploaded image tokens, keyed by content digest
+_TOKEN_CACHE_SIZE = 128
+_TOKEN_TTL = 3600  # seconds
+
+
+# Image type from filename, e.g. "accessory_2_nobg.png" -> "accessory_2"
+_TYPE_RE = re.compile(r'(base_character|accessory_\d+)', re.IGNORECASE)
+
+
+def _classify(path: str) -> str:
+    """Image type (base_character, accessory_N) from a file path, or unknown"""
+    match = _TYPE_RE.search(os.path.basename(path))
+    return match.group(1).lower() if match else "unknown"
+
+
+# Connection pools for the Tripo3D API and its model CDN, one per event loop
+# (an httpx client's connections belong to the loop that opened them)
+_SHARED_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_SHARED_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_shared_client() -> httpx.AsyncClient:
+    """Get or lazily create the running loop's shared HTTP/2 client"""
+    loop = asyncio.get_running_loop()
+    with _SHARED_CLIENTS_LOCK:
+        client = _SHARED_CLIENTS.get(loop)
+        if client is None or client.is_closed:
+            client = _SHARED_CLIENTS[loop] = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+                timeout=httpx.Timeout(getattr(settings, 'TRIPO3D_TIMEOUT', 300))
+            )
+    return client
+
+
+async def shutdown():
+    """Close the running loop's shared HTTP client
+
+    Call before the loop ends: from the app's shutdown handler, or at the
+    end of a script's asyncio.run.
+    """
+    with _SHARED_CLIENTS_LOCK:
+        client = _SHARED_CLIENTS.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _file_digest(path: str) -> str:
+    """BLAKE2b digest of a file's contents, read in 1 MB chunks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TaskPoller:
+    """Shared poller for all in-flight Tripo3D tasks
+
+    One background loop checks every due task concurrently over the client's
+    keep-alive pool and resolves the waiters of tasks that finished. Each
+    task keeps its own adaptive schedule; throttling and server errors are
+    tracked once for the whole client. The loop exits when nothing is pending.
+    """
+
+    def __init__(self, client: "Tripo3DClient"):
+        self._client = client
+        self._pending: Dict[str, Dict] = {}
+        self._failures = deque()
+        self._wakeup = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+
+    async def wait(self, task_id: str,
+                   on_success: Optional[Callable[[Dict], Awaitable[Any]]] = None) -> Optional[Dict]:
+        """Wait for a task to finish
+
+        Args:
+            task_id: Task identifier
+            on_success: Coroutine function started with the task output in the
+                same polling tick that sees success; awaited before returning
+
+        Returns:
+            Task output data or None if failed
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._pending.get(task_id)
+        if entry is None:
+            now = loop.time()
+            entry = {
+                'future': loop.create_future(),
+                # Same overall budget as the old fixed schedule (attempts x interval)
+                'deadline': now + self._client.max_poll_attempts * self._client.poll_interval,
+                'next_at': now,
+                'attempts': 0,
+                'progress': 0,
+                'on_success': [],
+                'callbacks': [],
+            }
+            self._pending[task_id] = entry
+            self._wakeup.set()
+            if self._runner is None or self._runner.done():
+                self._runner = loop.create_task(self._run())
+        if on_success is not None:
+            entry['on_success'].append(on_success)
+
+        result = await entry['future']
+        if entry['callbacks']:
+            await asyncio.gather(*entry['callbacks'])
+        return result
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._pending:
+                self._wakeup.clear()
+                now = loop.time()
+                due = [task_id for task_id, entry in self._pending.items() if entry['next_at'] <= now]
+                if due:
+                    await asyncio.gather(*(self._poll_one(task_id) for task_id in due))
+                if not self._pending:
+                    break
+
+                delay = min(entry['next_at'] for entry in self._pending.values()) - loop.time()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+        except Exception as e:
+            logger.error(f"Task poller stopped: {e}")
+            for task_id in list(self._pending):
+                self._resolve(task_id, None)
+
+    async def _poll_one(self, task_id: str):
+        entry = self._pending[task_id]
+        if entry['future'].done():
+            # Waiter was cancelled
+            self._pending.pop(task_id, None)
+            return
+
+        state, payload = await self._client._check_task(task_id)
+
+        if state == 'success':
+            if payload:
+                entry['callbacks'] = [asyncio.ensure_future(cb(payload)) for cb in entry['on_success']]
+            self._resolve(task_id, payload)
+            return
+        if state == 'failed':
+            self._resolve(task_id, None)
+            return
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if state == 'retry':
+            self._failures.append(now)
+        else:
+            entry['progress'] = payload
+        # Sliding window: only failures from the last minute raise the delay
+        while self._failures and now - self._failures[0] > 60:
+            self._failures.popleft()
+
+        entry['attempts'] += 1
+        if now >= entry['deadline']:
+            logger.error(f"Task {task_id} polling timed out after {entry['attempts']} attempts")
+            self._resolve(task_id, None)
+            return
+        entry['next_at'] = now + self._client._poll_delay(
+            entry['attempts'], entry['progress'], len(self._failures)
+        )
+
+    async def close(self):
+        """Stop the polling loop; pending waiters get None"""
+        runner, self._runner = self._runner, None
+        if runner is not None and not runner.done():
+            runner.cancel()
+            try:
+                await runner
+            except asyncio.CancelledError:
+                pass
+        for task_id in list(self._pending):
+            self._resolve(task_id, None)
+
+    def _resolve(self, task_id: str, result: Optional[Dict]):
+        entry = self._pending.pop(task_id, None)
+        if entry and not entry['future'].done():
+            entry['future'].set_result(result)
+
 
 class Tripo3DClient:
     """Client for Tripo3D image-to-3D generation API"""
@@ -34,20 +234,107 @@ class Tripo3DClient:
         self.timeout = getattr(settings, 'TRIPO3D_TIMEOUT', 300)
         self.poll_interval = getattr(settings, 'TRIPO3D_POLL_INTERVAL', 5)
         self.max_poll_attempts = getattr(settings, 'TRIPO3D_MAX_POLL_ATTEMPTS', 120)
+        self.min_poll_interval = getattr(settings, 'TRIPO3D_MIN_POLL_INTERVAL', 1)
+        self.max_poll_interval = getattr(settings, 'TRIPO3D_MAX_POLL_INTERVAL', 15)
+        self._poller = TaskPoller(self)
+
+        # Cap in-flight transfers and task creations to avoid 429s on wide fan-out
+        self._upload_sem = asyncio.Semaphore(getattr(settings, 'TRIPO3D_MAX_CONCURRENT_UPLOADS', 4))
+        self._task_sem = asyncio.Semaphore(getattr(settings, 'TRIPO3D_MAX_CONCURRENT_TASKS', 8))
+
+        # digest -> (image_token, uploaded_at); identical images are uploaded once
+        self._token_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # Set once the API rejects the key/account; short-circuits later calls
+        self._auth_dead = False
 
         # Model version - v3.0 for ultra quality with geometry_quality support
         self.model_version = getattr(settings, 'TRIPO3D_MODEL_VERSION', 'v3.0-20250812')
 
-        self.client = httpx.AsyncClient(
-            timeout=httpx.Timeout(self.timeout),
-            headers={
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-        )
+        # Sent per request: the connection pool is shared by every instance and
+        # CDN downloads (signed URLs) must not carry the API key.
+        # JSON bodies are pre-encoded orjson bytes, so they send _json_headers;
+        # multipart uploads (files=) let httpx set Content-Type
+        self._auth_headers = {"Authorization": f"Bearer {self.api_key}"}
+        self._json_headers = {**self._auth_headers, "Content-Type": "application/json"}
+
+        # Static parts of the task request bodies; only ids/tokens vary per call
+        self._task_template = {
+            "type": "image_to_model",
+            "model_version": self.model_version,
+            # NEW: Enable image auto-optimization
+            "enable_image_autofix": True,
+            "texture": True,
+            "pbr": True,
+            "texture_quality": "detailed",  # 4K textures
+            "texture_alignment": "original_image",  # Prioritize visual fidelity
+            "geometry_quality": "detailed",  # Ultra mesh quality (v3.0+)
+            "orientation": "align_image",  # Auto-rotate to align with original image
+            "auto_size": False
+        }
+        self._retexture_template = {
+            "type": "texture_model",
+            "texture": True,
+            "pbr": True,  # Generate PBR with current texture
+            "texture_quality": "detailed",  # 4K
+            "texture_alignment": "original_image",  # Prioritize 3D structural accuracy
+            "model_version": self.model_version,
+        }
 
         logger.info(f"Tripo3D client initialized - Model version: {self.model_version}")
 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client shared by every instance on the running loop"""
+        return _get_shared_client()
+
+    def _check_permanent_failure(self, response: httpx.Response) -> bool:
+        """Flag the client if the response is a permanent auth/credit failure
+
+        Args:
+            response: API response
+
+        Returns:
+            True if the request can never succeed with this key
+        """
+        if response.status_code in _PERMANENT_STATUS_CODES:
+            if not self._auth_dead:
+                logger.error(f"Tripo3D rejected the request ({response.status_code}): {response.text} "
+                             f"- skipping remaining API calls (check API key/credits)")
+            self._auth_dead = True
+            return True
+        return False
+
+    async def _retrying_request(self, fn: Callable[[], Awaitable[httpx.Response]], *,
+                                attempts: int = 3, base: float = 0.5, cap: float = 8.0) -> httpx.Response:
+        """Run an idempotent request, retrying transient failures
+
+        Connection errors and 429/5xx responses are retried with exponential
+        backoff plus jitter. Not for task creation - a retried POST could
+        spend credits twice.
+
+        Args:
+            fn: Coroutine function performing one attempt
+            attempts: Maximum number of attempts
+            base: Initial backoff in seconds
+            cap: Maximum backoff in seconds
+
+        Returns:
+            The last response (re-raises the transport error if the last attempt failed)
+        """
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                response = await fn()
+            except httpx.TransportError as e:
+                if last:
+                    raise
+                logger.warning(f"Transient request error ({e}), retrying ({attempt + 1}/{attempts})")
+            else:
+                if last or (response.status_code != 429 and response.status_code < 500):
+                    return response
+                logger.warning(f"Request got status {response.status_code}, retrying ({attempt + 1}/{attempts})")
+            await asyncio.sleep(min(cap, base * 2 ** attempt) + random.uniform(0, 0.25))
+
     async def _preprocess_image(self, image_path: str) -> str:
         """Crop transparent borders and upscale for maximum 3D detail
 
@@ -110,25 +397,43 @@ class Tripo3DClient:
         Returns:
             image_token or None if failed
         """
-        try:
-            async with aiofiles.open(image_path, 'rb') as f:
-                image_data = await f.read()
-
-            # Use multipart form upload
-            files = {'file': (os.path.basename(image_path), image_data)}
+        if self._auth_dead:
+            return None
 
-            async with httpx.AsyncClient(timeout=60) as upload_client:
-                response = await upload_client.post(
-                    f"{self.BASE_URL}/upload",
-                    headers={"Authorization": f"Bearer {self.api_key}"},
-                    files=files
-                )
+        try:
+            digest = await asyncio.to_thread(_file_digest, image_path)
+            cached = self._token_cache.get(digest)
+            if cached and time.monotonic() - cached[1] < _TOKEN_TTL:
+                self._token_cache.move_to_end(digest)
+                logger.info(f"Reusing uploaded image token for {os.path.basename(image_path)}: {cached[0][:20]}...")
+                return cached[0]
+
+            # Multipart form upload, streamed from the open file handle
+            async def post_upload() -> httpx.Response:
+                async with self._upload_sem:
+                    with open(image_path, 'rb') as fh:
+                        files = {'file': (os.path.basename(image_path), fh, 'image/png')}
+                        return await self.client.post(
+                            f"{self.BASE_URL}/upload",
+                            headers=self._auth_headers,
+                            files=files,
+                            timeout=60
+                        )
+
+            response = await self._retrying_request(post_upload)
+
+            if self._check_permanent_failure(response):
+                return None
 
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 if data.get('code') == 0:
                     token = data['data']['image_token']
                     logger.info(f"Image uploaded successfully: {token[:20]}...")
+                    self._token_cache[digest] = (token, time.monotonic())
+                    self._token_cache.move_to_end(digest)
+                    if len(self._token_cache) > _TOKEN_CACHE_SIZE:
+                        self._token_cache.popitem(last=False)
                     return token
                 else:
                     logger.error(f"Upload failed: {data}")
@@ -151,41 +456,35 @@ class Tripo3DClient:
         Returns:
             task_id or None if failed
         """
+        if self._auth_dead:
+            return None
+
         try:
             request_data = {
-                "type": "image_to_model",
-                "model_version": self.model_version,
+                **self._task_template,
                 "file": {
                     "type": "png",
                     "file_token": image_token
                 },
-                # NEW: Enable image auto-optimization
-                "enable_image_autofix": True,
-                "texture": True,
-                "pbr": True,
-                "texture_quality": "detailed",  # 4K textures
-                "texture_alignment": "original_image",  # Prioritize visual fidelity
-                "geometry_quality": "detailed",  # Ultra mesh quality (v3.0+)
-                "orientation": "align_image",  # Auto-rotate to align with original image
-                "auto_size": False
+                # Adjust face count based on image type
+                "face_limit": 300000 if "base_character" in image_type else 50000
             }
 
-            # Adjust face count based on image type
-            if "base_character" in image_type:
-                request_data["face_limit"] = 300000  # Higher detail for characters
-            else:
-                request_data["face_limit"] = 50000  # Good detail for accessories
-
             logger.info(f"Creating task with settings: model={self.model_version}, "
                        f"geometry_quality=detailed, texture_quality=detailed, enable_image_autofix=True")
 
-            response = await self.client.post(
-                f"{self.BASE_URL}/task",
-                json=request_data
-            )
+            async with self._task_sem:
+                response = await self.client.post(
+                    f"{self.BASE_URL}/task",
+                    headers=self._json_headers,
+                    content=orjson.dumps(request_data)
+                )
+
+            if self._check_permanent_failure(response):
+                return None
 
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 if data.get('code') == 0:
                     task_id = data['data']['task_id']
                     logger.info(f"Task created: {task_id}")
@@ -212,27 +511,27 @@ class Tripo3DClient:
         Returns:
             New task_id for retexture task or None if failed
         """
+        if self._auth_dead:
+            return None
+
         try:
-            request_data = {
-                "type": "texture_model",
-                "original_model_task_id": original_task_id,
-                "texture": True,
-                "pbr": True,  # Generate PBR with current texture
-                "texture_quality": "detailed",  # 4K
-                "texture_alignment": "original_image",  # Prioritize 3D structural accuracy
-                "model_version": self.model_version,
-            }
+            request_data = {**self._retexture_template, "original_model_task_id": original_task_id}
             logger.info(f"Upscaling texture to 4K with PBR and geometry alignment")
 
             logger.info(f"Re-texturing model from task: {original_task_id}")
 
-            response = await self.client.post(
-                f"{self.BASE_URL}/task",
-                json=request_data
-            )
+            async with self._task_sem:
+                response = await self.client.post(
+                    f"{self.BASE_URL}/task",
+                    headers=self._json_headers,
+                    content=orjson.dumps(request_data)
+                )
+
+            if self._check_permanent_failure(response):
+                return None
 
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 if data.get('code') == 0:
                     task_id = data['data']['task_id']
                     logger.info(f"Retexture task created: {task_id}")
@@ -248,56 +547,84 @@ class Tripo3DClient:
             logger.error(f"Error creating retexture task: {e}")
             return None
 
-    async def _poll_task(self, task_id: str) -> Optional[Dict]:
-        """Poll task until completion
+    def _poll_delay(self, attempts: int, progress: int, recent_failures: int) -> float:
+        """Seconds to wait before the next poll
+
+        Polls quickly while a task is young and backs off as it ages. Recent
+        throttling or server errors push the delay up; a task that is almost
+        done is checked again after the minimum interval.
+        """
+        delay = min(self.max_poll_interval, self.min_poll_interval * (1.5 ** min(attempts, 8)))
+        if recent_failures:
+            return min(self.max_poll_interval, delay * (2 ** recent_failures))
+        if progress >= 90:
+            return self.min_poll_interval
+        return delay
+
+    async def _check_task(self, task_id: str) -> Tuple[str, Any]:
+        """Fetch the current status of a task once
 
         Args:
             task_id: Task identifier
 
         Returns:
-            Task output data or None if failed
+            (state, payload) where state is one of:
+            'success' (payload = task output), 'failed' (payload = None),
+            'pending' (payload = progress percent), 'retry' (payload = None,
+            throttled or transient error - caller should back off)
         """
-        attempts = 0
-
-        while attempts < self.max_poll_attempts:
-            try:
-                response = await self.client.get(f"{self.BASE_URL}/task/{task_id}")
-
-                if response.status_code != 200:
-                    logger.error(f"Task poll failed: {response.status_code}")
-                    return None
+        if self._auth_dead:
+            return 'failed', None
 
-                data = response.json()
-                if data.get('code') != 0:
-                    logger.error(f"Task poll error: {data}")
-                    return None
-
-                task_data = data['data']
-                status = task_data.get('status')
-                progress = task_data.get('progress', 0)
+        try:
+            response = await self.client.get(f"{self.BASE_URL}/task/{task_id}", headers=self._auth_headers)
+
+            if self._check_permanent_failure(response):
+                return 'failed', None
+            if response.status_code == 429 or response.status_code >= 500:
+                logger.warning(f"Task poll for {task_id} got status {response.status_code}, backing off")
+                return 'retry', None
+            if response.status_code != 200:
+                logger.error(f"Task poll failed: {response.status_code}")
+                return 'failed', None
+
+            data = orjson.loads(response.content)
+            if data.get('code') != 0:
+                logger.error(f"Task poll error: {data}")
+                return 'failed', None
+
+            task_data = data['data']
+            status = task_data.get('status')
+            progress = task_data.get('progress', 0) or 0
+
+            logger.info(f"Task {task_id}: {status} ({progress}%)")
+
+            if status == 'success':
+                return 'success', task_data.get('output', {})
+            elif status in ['failed', 'banned', 'cancelled', 'expired']:
+                logger.error(f"Task {task_id} ended with status: {status}")
+                return 'failed', None
+            elif status not in ['queued', 'running']:
+                logger.warning(f"Unknown task status: {status}")
+            return 'pending', progress
 
-                logger.info(f"Task {task_id}: {status} ({progress}%)")
+        except Exception as e:
+            logger.error(f"Error polling task {task_id}: {e}")
+            return 'retry', None
 
-                if status == 'success':
-                    return task_data.get('output', {})
-                elif status in ['failed', 'banned', 'cancelled', 'expired']:
-                    logger.error(f"Task {task_id} ended with status: {status}")
-                    return None
-                elif status in ['queued', 'running']:
-                    await asyncio.sleep(self.poll_interval)
-                    attempts += 1
-                else:
-                    logger.warning(f"Unknown task status: {status}")
-                    await asyncio.sleep(self.poll_interval)
-                    attempts += 1
+    async def _poll_task(self, task_id: str,
+                         on_success: Optional[Callable[[Dict], Awaitable[Any]]] = None) -> Optional[Dict]:
+        """Poll task until completion
 
-            except Exception as e:
-                logger.error(f"Error polling task {task_id}: {e}")
-                attempts += 1
-                await asyncio.sleep(self.poll_interval)
+        Args:
+            task_id: Task identifier
+            on_success: Optional coroutine function fired with the output as soon
+                as success is seen; it has finished by the time this returns
 
-        logger.error(f"Task {task_id} polling timed out after {attempts} attempts")
-        return None
+        Returns:
+            Task output data or None if failed
+        """
+        return await self._poller.wait(task_id, on_success)
 
     async def _download_model(self, model_url: str, output_path: str) -> bool:
         """Download model from URL
@@ -309,18 +636,33 @@ class Tripo3DClient:
         Returns:
             True if successful
         """
+        total_bytes = 0
+
+        async def fetch() -> httpx.Response:
+            nonlocal total_bytes
+            async with self._upload_sem:
+                async with self.client.stream('GET', model_url, timeout=120) as response:
+                    if response.status_code != 200:
+                        return response
+
+                    total_bytes = 0
+                    f = await asyncio.to_thread(open, output_path, 'wb')
+                    try:
+                        async for chunk in response.aiter_bytes(chunk_size=65536):
+                            await asyncio.to_thread(f.write, chunk)
+                            total_bytes += len(chunk)
+                    finally:
+                        f.close()
+                    return response
+
         try:
-            async with httpx.AsyncClient(timeout=120) as download_client:
-                response = await download_client.get(model_url)
-
-                if response.status_code == 200:
-                    async with aiofiles.open(output_path, 'wb') as f:
-                        await f.write(response.content)
-                    logger.info(f"Model downloaded: {output_path} ({len(response.content)} bytes)")
-                    return True
-                else:
-                    logger.error(f"Download failed: {response.status_code}")
-                    return False
+            response = await self._retrying_request(fetch)
+            if response.status_code != 200:
+                logger.error(f"Download failed: {response.status_code}")
+                return False
+
+            logger.info(f"Model downloaded: {output_path} ({total_bytes} bytes)")
+            return True
 
         except Exception as e:
             logger.error(f"Error downloading model: {e}")
@@ -339,7 +681,7 @@ class Tripo3DClient:
         try:
             logger.info(f"Generating 3D model from: {image_path}")
 
-            if not os.path.exists(image_path):
+            if not await asyncio.to_thread(os.path.exists, image_path):
                 return {
                     "success": False,
                     "error": f"Image file not found: {image_path}",
@@ -348,13 +690,7 @@ class Tripo3DClient:
 
             # Determine image type
             filename = os.path.basename(image_path)
-            image_type = "unknown"
-            if "base_character" in filename:
-                image_type = "base_character"
-            elif "accessory" in filename:
-                parts = filename.split('_')
-                if len(parts) >= 2:
-                    image_type = f"{parts[0]}_{parts[1]}"
+            image_type = _classify(filename)
 
             # Create image metadata
             image_metadata = {
@@ -414,7 +750,7 @@ class Tripo3DClient:
             Model metadata with task_id, or dict with error key if failed
         """
         image_path = image_data.get('file_path') or image_data.get('processed_path')
-        image_type = image_data.get('type', 'unknown')
+        image_type = image_data.get('type') or _classify(image_path or '')
 
         if not image_path:
             logger.error(f"[{image_type}] No file_path or processed_path in image_data")
@@ -473,25 +809,24 @@ class Tripo3DClient:
         image_type = task_info['image_type']
         task_id = task_info['task_id']
 
-        try:
-            # Wait for initial model
-            logger.info(f"[{image_type}] Waiting for initial model...")
-            output = await self._poll_task(task_id)
-            if not output:
-                logger.error(f"[{image_type}] Initial model generation failed")
-                return None
-
-            task_info['initial_output'] = output
-
+        async def start_retexture(output: Dict):
             # Start retexture with original image for better texture quality
             logger.info(f"[{image_type}] Starting retexture...")
-            image_token = task_info.get('image_token')
-            retexture_task_id = await self._retexture_model(task_id, image_token)
+            retexture_task_id = await self._retexture_model(task_id, task_info.get('image_token'))
             if retexture_task_id:
                 task_info['retexture_task_id'] = retexture_task_id
             else:
                 logger.warning(f"[{image_type}] Could not start retexture, will use original")
 
+        try:
+            # Wait for initial model; retexture is requested from the same poll tick
+            logger.info(f"[{image_type}] Waiting for initial model...")
+            output = await self._poll_task(task_id, on_success=start_retexture)
+            if not output:
+                logger.error(f"[{image_type}] Initial model generation failed")
+                return None
+
+            task_info['initial_output'] = output
             return task_info
 
         except Exception as e:
@@ -537,8 +872,11 @@ class Tripo3DClient:
                 logger.error(f"[{image_type}] No model URL in output")
                 return None
 
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            model_filename = f"{image_type}_3d_{timestamp}.glb"
+            # One clock read for both the filename and the metadata; the random
+            # suffix keeps names unique when models of a type finish in the same second
+            created_at = datetime.now().isoformat()
+            timestamp = created_at[:19].replace('-', '').replace(':', '').replace('T', '_')
+            model_filename = f"{image_type}_3d_{timestamp}_{uuid4().hex[:8]}.glb"
             model_path = os.path.join(models_dir, model_filename)
 
             logger.info(f"[{image_type}] Downloading model...")
@@ -546,6 +884,11 @@ class Tripo3DClient:
                 logger.error(f"[{image_type}] Failed to download model")
                 return None
 
+            try:
+                file_size = (await asyncio.to_thread(os.stat, model_path)).st_size
+            except FileNotFoundError:
+                file_size = 0
+
             # Create metadata
             model_metadata = {
                 'type': image_type,
@@ -557,8 +900,8 @@ class Tripo3DClient:
                 'model_url': f"/storage/processed/{job_id}/3d_models/{model_filename}",
                 'generation_method': 'tripo3d_api',
                 'task_id': task_id,
-                'created_at': datetime.now().isoformat(),
-                'file_size_bytes': os.path.getsize(model_path) if os.path.exists(model_path) else 0
+                'created_at': created_at,
+                'file_size_bytes': file_size
             }
 
             logger.info(f"[{image_type}] 3D model created successfully")
@@ -568,6 +911,29 @@ class Tripo3DClient:
             logger.error(f"[{image_type}] Error in download phase: {e}")
             return None
 
+    async def _pipeline_one(self, image_data: Dict, job_id: str, models_dir: str) -> Optional[Dict]:
+        """Run one image through upload/create, wait/retexture and download
+
+        Args:
+            image_data: Image metadata
+            job_id: Job identifier
+            models_dir: Directory to save models
+
+        Returns:
+            Model metadata or None if any stage failed
+        """
+        task_info = await self._process_single_image(image_data, job_id, models_dir)
+        if not task_info or not task_info.get('task_id'):
+            error = (task_info or {}).get('error', 'unknown error')
+            logger.error(f"[{image_data.get('type', 'unknown')}] No task created: {error}")
+            return None
+
+        task_info = await self._wait_and_retexture(task_info)
+        if not task_info:
+            return None
+
+        return await self._wait_retexture_and_download(task_info)
+
     async def convert_images_to_3d(self, job_id: str, processed_images: List[Dict]) -> List[Dict]:
         """Convert all processed images to 3D models (PARALLEL processing)
 
@@ -578,80 +944,31 @@ class Tripo3DClient:
         Returns:
             List of 3D model metadata
         """
+        # Give the key another chance per job (credits may have been topped up)
+        self._auth_dead = False
+
         # Create 3D models directory
         models_dir = os.path.join(settings.PROCESSED_PATH, job_id, "3d_models")
-        os.makedirs(models_dir, exist_ok=True)
+        await asyncio.to_thread(os.makedirs, models_dir, exist_ok=True)
 
         logger.info(f"Converting {len(processed_images)} images to 3D for job {job_id} (PARALLEL)")
         for i, img in enumerate(processed_images):
             logger.info(f"  [{i+1}] {img.get('type')}: {img.get('file_path') or img.get('processed_path')}")
 
-        # Phase 1: Upload all images and create tasks in parallel
-        logger.info("Phase 1: Uploading images and creating tasks...")
-        upload_tasks = [
-            self._process_single_image(img_data, job_id, models_dir)
-            for img_data in processed_images
-        ]
-        raw_results = await asyncio.gather(*upload_tasks, return_exceptions=True)
+        # Each image runs its own upload -> generate -> retexture -> download
+        # pipeline, so a fast image never waits on a slow one between stages
+        raw_results = await asyncio.gather(
+            *[self._pipeline_one(img_data, job_id, models_dir) for img_data in processed_images],
+            return_exceptions=True
+        )
 
-        # Log and filter Phase 1 results
-        task_infos = []
-        for i, result in enumerate(raw_results):
-            img_type = processed_images[i].get('type', f'image_{i}')
-            if isinstance(result, Exception):
-                logger.error(f"[{img_type}] Phase 1 exception: {result}")
-            elif result is None:
-                logger.error(f"[{img_type}] Phase 1 returned None")
-            elif not result.get('task_id'):
-                logger.error(f"[{img_type}] Phase 1 no task_id: {result.get('error', 'unknown error')}")
-            else:
-                task_infos.append(result)
-        logger.info(f"Phase 1 complete: {len(task_infos)}/{len(processed_images)} tasks created")
-
-        if not task_infos:
-            logger.error("No tasks created in Phase 1 - aborting")
-            return []
-
-        # Phase 2: Wait for initial models and start retexture in parallel
-        logger.info("Phase 2: Waiting for initial models and starting retexture...")
-        retexture_tasks = [
-            self._wait_and_retexture(task_info)
-            for task_info in task_infos
-        ]
-        raw_results = await asyncio.gather(*retexture_tasks, return_exceptions=True)
-
-        # Log and filter Phase 2 results
-        task_infos_2 = []
-        for i, result in enumerate(raw_results):
-            img_type = task_infos[i].get('type', f'task_{i}')
-            if isinstance(result, Exception):
-                logger.error(f"[{img_type}] Phase 2 exception: {result}")
-            elif result is None:
-                logger.error(f"[{img_type}] Phase 2 returned None")
-            else:
-                task_infos_2.append(result)
-        logger.info(f"Phase 2 complete: {len(task_infos_2)} models ready for retexture")
-
-        if not task_infos_2:
-            logger.error("No models ready after Phase 2 - aborting")
-            return []
-
-        # Phase 3: Wait for retexture and download all models in parallel
-        logger.info("Phase 3: Waiting for retexture and downloading models...")
-        download_tasks = [
-            self._wait_retexture_and_download(task_info)
-            for task_info in task_infos_2
-        ]
-        raw_results = await asyncio.gather(*download_tasks, return_exceptions=True)
-
-        # Log and filter Phase 3 results
         models_3d = []
         for i, result in enumerate(raw_results):
-            img_type = task_infos_2[i].get('type', f'model_{i}')
+            img_type = processed_images[i].get('type', f'image_{i}')
             if isinstance(result, Exception):
-                logger.error(f"[{img_type}] Phase 3 exception: {result}")
+                logger.error(f"[{img_type}] Pipeline exception: {result}")
             elif result is None:
-                logger.error(f"[{img_type}] Phase 3 returned None")
+                logger.error(f"[{img_type}] Pipeline returned None")
             else:
                 models_3d.append(result)
 
@@ -666,7 +983,9 @@ class Tripo3DClient:
         """
         try:
             # Try to get a non-existent task - if we get 404, API is working
-            response = await self.client.get(f"{self.BASE_URL}/task/test-health-check")
+            response = await self.client.get(
+                f"{self.BASE_URL}/task/test-health-check", headers=self._auth_headers
+            )
             # 404 means API is working, just task not found
             # 401 means auth issue
             # 200 would be unexpected but OK
@@ -684,12 +1003,15 @@ class Tripo3DClient:
             return False
 
     async def close(self):
-        """Close the HTTP client"""
-        await self.client.aclose()
+        """Stop this client's task polling
 
-    def __del__(self):
-        """Cleanup on deletion"""
-        try:
-            asyncio.create_task(self.close())
-        except:
-            pass
+        The pooled HTTP client is shared with every other instance on the
+        loop and is left open; ``shutdown()`` closes it.
+        """
+        await self._poller.close()
+
+    async def __aenter__(self) -> "Tripo3DClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
@@ -0,0 +1,5 @@
+"""Shared test setup"""
+import os
+
+# config.settings refuses to import without an OpenAI key
+os.environ.setdefault("OPENAI_API_KEY", "test")
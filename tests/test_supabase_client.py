@@ -0,0 +1,366 @@
+"""Tests for services.supabase_client against an in-memory PostgREST"""
+import asyncio
+import json
+import re
+import threading
+import uuid
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from services import supabase_client as supabase_module
+from services.supabase_client import SupabaseClient
+
+
+class FakePostgrest:
+    """Just enough of PostgREST's /orders endpoint for the client's queries"""
+
+    def __init__(self):
+        self.rows = []
+        self.requests = []
+        self.insert_gate = None  # asyncio.Event that holds back inserts until set
+
+    @staticmethod
+    def _split(text):
+        """Split a logic tree's items on top-level commas"""
+        items, depth, quoted, start, i = [], 0, False, 0, 0
+        while i < len(text):
+            char = text[i]
+            if quoted and char == "\\":
+                i += 1
+            elif char == '"':
+                quoted = not quoted
+            elif not quoted and char == "(":
+                depth += 1
+            elif not quoted and char == ")":
+                depth -= 1
+            elif not quoted and depth == 0 and char == ",":
+                items.append(text[start:i])
+                start = i + 1
+            i += 1
+        items.append(text[start:])
+        return items
+
+    def _test(self, row, column, condition):
+        if column in ("or", "and"):
+            results = [self._test_item(row, item) for item in self._split(condition[1:-1])]
+            return any(results) if column == "or" else all(results)
+        negate = condition.startswith("not.")
+        if negate:
+            condition = condition[4:]
+        op, _, value = condition.partition(".")
+        if value.startswith('"'):
+            value = re.sub(r"\\(.)", r"\1", value[1:-1])
+        current = row.get(column)
+        if op == "is":
+            result = current is None
+        elif op == "in":
+            result = current is not None and str(current) in value.strip("()").split(",")
+        elif current is None:
+            result = False  # SQL comparisons with NULL are never true
+        else:
+            result = {"eq": str(current) == value, "gt": str(current) > value, "lt": str(current) < value}[op]
+        return not result if negate else result
+
+    def _test_item(self, row, item):
+        for tree in ("or", "and"):
+            if item.startswith(tree + "("):
+                return self._test(row, tree, item[len(tree):])
+        column, _, condition = item.partition(".")
+        return self._test(row, column, condition)
+
+    def _matches(self, row, params):
+        return all(
+            self._test(row, column, condition)
+            for column, condition in params.multi_items()
+            if column not in ("select", "order", "limit", "offset")
+        )
+
+    def _select(self, params):
+        rows = [row for row in self.rows if self._matches(row, params)]
+        # Postgres default ordering: NULLs sort as larger than any value
+        for key in reversed(params.get("order", "").split(",") if "order" in params else []):
+            column, _, direction = key.partition(".")
+            rows.sort(key=lambda row: (row.get(column) is None, str(row.get(column))), reverse=direction == "desc")
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+        return self._project(rows, params)
+
+    @staticmethod
+    def _project(rows, params):
+        columns = params.get("select", "*")
+        if columns == "*":
+            return rows
+        return [{column: row.get(column) for column in columns.split(",")} for row in rows]
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.method == "POST" and self.insert_gate is not None:
+            await self.insert_gate.wait()
+        if request.url.path == "/rest/v1/rpc/search_orders":
+            q = json.loads(request.content)["q"]
+            found = [row for row in self.rows if q in (row.get("customer_name") or "")]
+            return httpx.Response(200, json=self._project(found, request.url.params))
+        if request.url.path != "/rest/v1/orders":
+            return httpx.Response(404, json={"message": "Not found", "code": "PGRST202"})
+        params = request.url.params
+        if request.method == "GET":
+            rows = self._select(params)
+            headers = {}
+            if "count=exact" in request.headers.get("prefer", ""):
+                total = len([row for row in self.rows if self._matches(row, params)])
+                headers["content-range"] = f"0-{max(len(rows) - 1, 0)}/{total}"
+            return httpx.Response(200, json=rows, headers=headers)
+        if request.method == "POST":
+            created = []
+            for record in json.loads(request.content):
+                created.append(dict(record, id=str(uuid.uuid4()), search_tsv="'tsv'"))
+            self.rows.extend(created)
+            return httpx.Response(201, json=self._project(created, params))
+        if request.method == "PATCH":
+            changes = json.loads(request.content)
+            for row in self.rows:
+                if self._matches(row, params):
+                    row.update(changes)
+            return httpx.Response(204)
+        return httpx.Response(405)
+
+
+@pytest.fixture
+def postgrest():
+    return FakePostgrest()
+
+
+@pytest.fixture
+def client(monkeypatch, postgrest):
+    monkeypatch.setattr(supabase_module.settings, "SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setattr(supabase_module.settings, "SUPABASE_SERVICE_KEY", "header.payload.signature")
+    monkeypatch.setattr(supabase_module.settings, "SUPABASE_DB_URL", "")
+
+    configure = SupabaseClient._configure_http_session
+
+    async def configure_with_fake(self, client):
+        await configure(self, client)
+        client.postgrest.session._transport = httpx.MockTransport(postgrest.handle)
+
+    monkeypatch.setattr(SupabaseClient, "_configure_http_session", configure_with_fake)
+    return SupabaseClient()
+
+
+def _order(job_id, **fields):
+    return dict({"job_id": job_id, "status": "pending", "is_test": True}, **fields)
+
+
+def test_update_invalidates_cached_order(client, postgrest):
+    async def scenario():
+        await client.create_order(_order("job-1"))
+        first = await client.get_order("job-1")
+        gets = len(postgrest.requests)
+
+        # Served from the cache, and mutating the copy doesn't touch it
+        first["data"]["status"] = "mutated"
+        cached = await client.get_order("job-1")
+        assert len(postgrest.requests) == gets
+        assert cached["data"]["status"] == "pending"
+
+        await client.update_order_status("job-1", "completed")
+        updated = await client.get_order("job-1")
+        await client.close()
+        return updated
+
+    updated = asyncio.run(scenario())
+    assert updated["data"]["status"] == "completed"
+
+
+def test_client_used_from_a_second_event_loop(client, postgrest):
+    """Order processing runs each order on its own loop in a worker thread"""
+    postgrest.rows.append(dict(_order("job-2"), id=str(uuid.uuid4())))
+
+    async def on_main_loop():
+        return await client.get_order("job-2")
+
+    assert asyncio.run(on_main_loop())["data"]["status"] == "pending"
+
+    results = {}
+
+    def worker():
+        loop = asyncio.new_event_loop()
+        try:
+            results["status"] = loop.run_until_complete(
+                client.update_order_status("job-2", "processing")
+            )
+            results["outputs"] = loop.run_until_complete(
+                client.update_order_outputs("job-2", {"stl_path": "/tmp/job-2.stl"})
+            )
+        finally:
+            loop.run_until_complete(client.close())
+            loop.close()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    assert results["status"] == {"success": True}
+    assert results["outputs"] == {"success": True}
+    assert postgrest.rows[0]["status"] == "completed"
+    assert not client._loops
+
+    # The worker's write invalidated the cache shared with the main loop
+    async def after():
+        order = await client.get_order("job-2")
+        await client.close()
+        return order
+
+    assert asyncio.run(after())["data"]["stl_path"] == "/tmp/job-2.stl"
+
+
+def test_insert_timeout_drops_queued_and_reports_written(client, postgrest, monkeypatch):
+    monkeypatch.setattr(supabase_module, "_INSERT_TIMEOUT", 0.2)
+
+    async def scenario():
+        postgrest.insert_gate = asyncio.Event()
+        # The first insert is written alone and stalls; the second queues behind it
+        first = asyncio.create_task(client.create_order(_order("job-a", is_test=False)))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(client.create_order(_order("job-b", is_test=False)))
+        results = await asyncio.gather(first, second)
+
+        postgrest.insert_gate.set()
+        await client.close()
+        return results
+
+    in_flight, queued = asyncio.run(scenario())
+
+    assert in_flight == {"success": True, "pending": True, "data": None}
+    assert queued == {"success": False, "error": "Order insert timed out after 0.2s"}
+    # The in-flight insert still lands; the dropped one is never written
+    assert [row["job_id"] for row in postgrest.rows] == ["job-a"]
+
+
+def test_full_order_reads_leave_out_search_tsv(client, postgrest):
+    async def scenario():
+        created = await client.create_order(_order("job-1", customer_name="Ada"))
+        order = await client.get_order("job-1")
+        found = await client.search_orders("Ada")
+        await client.close()
+        return created, order, found
+
+    created, order, found = asyncio.run(scenario())
+
+    assert "search_tsv" in postgrest.rows[0]
+    for row in (created["data"], order["data"], found["data"][0]):
+        assert row["job_id"] == "job-1" and row["customer_name"] == "Ada"
+        assert "search_tsv" not in row
+
+
+def test_order_stats_fall_back_to_per_status_counts(client, postgrest):
+    for i, status in enumerate(["pending", "pending", "failed", "completed", "pending"]):
+        postgrest.rows.append(dict(_order(f"job-{i}", status=status), id=str(uuid.uuid4())))
+
+    async def scenario():
+        stats = await client.get_order_stats()
+        await client.close()
+        return stats
+
+    # No order_status_counts RPC on the fake, so each status is counted
+    stats = asyncio.run(scenario())
+    assert stats == {"success": True, "data": {
+        "total": 5, "pending": 3, "processing": 0, "completed": 1, "failed": 1
+    }}
+    counts = [request for request in postgrest.requests if request.url.path == "/rest/v1/orders"]
+    assert len(counts) == 4
+    assert all(request.url.params["select"] == "id" and request.url.params["limit"] == "1" for request in counts)
+
+
+@pytest.mark.parametrize("ascending", [True, False])
+def test_list_orders_cursor_round_trip(client, postgrest, ascending):
+    names = [None, "Smith, Jane", 'Say "hi"', "back\\slash", "close)paren", "a.b", None, "Smith, Jane", "zed"]
+    for i, name in enumerate(names):
+        postgrest.rows.append(dict(_order(f"job-{i}", customer_name=name), id=str(uuid.uuid4())))
+
+    async def walk():
+        seen = [order async for order in client.iter_orders(
+            page_size=2, order_by="customer_name", ascending=ascending
+        )]
+        await client.close()
+        return seen
+
+    seen = asyncio.run(walk())
+
+    assert len(seen) == len(names)
+    assert {order["job_id"] for order in seen} == {row["job_id"] for row in postgrest.rows}
+    non_null = [order["customer_name"] for order in seen if order["customer_name"] is not None]
+    assert non_null == sorted(non_null, reverse=not ascending)
+    # NULLs come last ascending and first descending
+    nulls_at = [i for i, order in enumerate(seen) if order["customer_name"] is None]
+    assert nulls_at == ([7, 8] if ascending else [0, 1])
+
+
+def test_list_orders_rejects_malformed_cursor(client):
+    async def scenario():
+        page = await client.list_orders(after=("x", "1),id.gt.(0"))
+        await client.close()
+        return page
+
+    assert asyncio.run(scenario()) == {"success": False, "error": "Invalid cursor"}
+
+
+class FakePool:
+    """asyncpg pool stand-in that records the statements it runs"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.statements = []
+        self.closed = False
+
+    def acquire(self):
+        assert asyncio.get_running_loop() is self.loop, "pool used from another event loop"
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, *args):
+        self.statements.append(sql)
+
+    async def close(self):
+        self.closed = True
+
+
+def test_pool_stays_on_the_main_thread_loop(client, postgrest, monkeypatch):
+    pools = []
+
+    async def create_pool(**kwargs):
+        pools.append(FakePool())
+        return pools[-1]
+
+    monkeypatch.setattr(supabase_module, "asyncpg", SimpleNamespace(create_pool=create_pool))
+    client.db_url = "postgresql://example"
+    postgrest.rows.append(dict(_order("job-3"), id=str(uuid.uuid4())))
+
+    results = []
+
+    def worker():
+        loop = asyncio.new_event_loop()
+        try:
+            results.append(loop.run_until_complete(client.update_order_status("job-3", "processing")))
+        finally:
+            loop.run_until_complete(client.close())
+            loop.close()
+
+    async def on_main_loop():
+        assert await client.update_order_status("job-3", "failed") == {"success": True}
+        # A worker thread's loop falls back to PostgREST instead of the pool
+        await asyncio.to_thread(worker)
+        await client.close()
+
+    asyncio.run(on_main_loop())
+
+    assert results == [{"success": True}]
+    assert len(pools) == 1 and pools[0].closed
+    assert pools[0].statements == ["UPDATE orders SET status = $2 WHERE job_id = $1"]
+    assert postgrest.rows[0]["status"] == "processing"
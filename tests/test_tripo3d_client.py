@@ -0,0 +1,19 @@
+"""Tests for the per-loop HTTP client pool in services.tripo3d_client"""
+import asyncio
+
+from services import tripo3d_client
+
+
+def test_each_event_loop_gets_its_own_http_client():
+    async def use_and_shutdown():
+        client = tripo3d_client._get_shared_client()
+        assert tripo3d_client._get_shared_client() is client
+        await tripo3d_client.shutdown()
+        return client
+
+    first = asyncio.run(use_and_shutdown())
+    second = asyncio.run(use_and_shutdown())
+
+    assert first is not second
+    assert first.is_closed and second.is_closed
+    assert not tripo3d_client._SHARED_CLIENTS
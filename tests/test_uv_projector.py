@@ -0,0 +1,45 @@
+"""Tests for services.uv_projector helpers that don't need Blender"""
+import hashlib
+import os
+import stat
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from services import uv_projector
+
+
+def _digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_blender_script_is_private_and_rewritten_when_changed():
+    path = uv_projector._ensure_script()
+    assert _digest(path) == uv_projector.SCRIPT_DIGEST
+    assert stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode) == 0o700
+
+    with open(path, 'a') as f:
+        f.write("\nimport os; os.system('echo planted')\n")
+    assert uv_projector._ensure_script() == path
+    assert _digest(path) == uv_projector.SCRIPT_DIGEST
+
+    os.unlink(path)
+    assert uv_projector._ensure_script() == path
+    assert _digest(path) == uv_projector.SCRIPT_DIGEST
+
+
+@pytest.mark.parametrize("size", [(70, 150), (600, 20), (300, 100), (77, 40)])
+def test_resize_matches_pillow_lanczos(size):
+    """Shrinking one axis while growing the other must not alias"""
+    rng = np.random.default_rng(0)
+    arr = rng.integers(0, 256, (64, 256, 4), dtype=np.uint8)
+    arr[..., 3] = 255
+
+    ours = uv_projector._resize_rgba(arr, *size).astype(int)
+    pillow = np.asarray(Image.fromarray(arr).resize(size, Image.Resampling.LANCZOS)).astype(int)
+
+    assert ours.shape == pillow.shape
+    # A single Lanczos pass over both axes is ~45 levels off on this noise
+    assert np.abs(ours - pillow)[..., :3].mean() < 12